@@ -1,24 +1,87 @@
-from pymongo import MongoClient
-from datetime import datetime, UTC
+from contextlib import asynccontextmanager
+from datetime import datetime
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
+from logging.handlers import QueueHandler, QueueListener
+import logging
 import os
-from pydantic import BaseModel, Field
-from fastapi import FastAPI, HTTPException, status
+import queue
+from pydantic import BaseModel, ConfigDict, Field
+from fastapi import Depends, FastAPI, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.decorator import cache
+from redis import asyncio as aioredis
 from typing import List, Optional, Dict, Any
 from database_task import DatabaseManager
+from celery_task import REDIS_URL, CACHE_PREFIX, VISITORS_CACHE_NAMESPACE, delete_visitor_task, get_task_status
 import uvicorn 
 
 load_dotenv()
 
-app = FastAPI(title="Visitor Parking Management API", version="1.0.0")
+VISITORS_CACHE_TTL = 30  # seconds
+MAX_VISITORS_PAGE_SIZE = 500
+MAX_BULK_VISITORS = 1000
 
-# --- INSTANTIATE DB MANAGER (Following the requested format) ---
-try:
-    db = DatabaseManager()
-except Exception as e:
-    print(f"Failed to connect to MongoDB: {e}")
-    db = None
+db: Optional[DatabaseManager] = None
+
+# Log records are queued by the request path and written to stderr on the listener's
+# own thread, so a slow terminal/file never blocks the event loop
+log_queue: queue.Queue = queue.Queue(-1)
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+log_listener = QueueListener(log_queue, log_handler, respect_handler_level=True)
+logger = logging.getLogger("api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the async DB manager (and its connection pool) before serving traffic."""
+    global db
+    # --- LOGGING (root logger, so database/cache libraries go through the queue too) ---
+    queue_handler = QueueHandler(log_queue)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(logging.INFO)
+    log_listener.start()
+
+    # --- INSTANTIATE DB MANAGER (Following the requested format) ---
+    try:
+        db = DatabaseManager()
+        await db.ping()
+        await db.init_database()
+    except Exception as e:
+        logger.exception("Failed to connect to MongoDB")
+        db = None
+
+    # --- RESPONSE CACHE (falls back to in-memory if Redis is not running) ---
+    # The in-memory cache lives only in this process, so the Celery worker's post-delete clear
+    # can't reach it; /tasks/{task_id} clears it once a delete has finished
+    redis = aioredis.from_url(REDIS_URL)
+    try:
+        await redis.ping()
+        FastAPICache.init(RedisBackend(redis), prefix=CACHE_PREFIX)
+    except Exception as e:
+        logger.warning("Redis unavailable, caching responses in memory: %s", e)
+        FastAPICache.init(InMemoryBackend(), prefix=CACHE_PREFIX)
+
+    yield
+
+    if db is not None:
+        await db.close_connection()
+    await redis.aclose()
+
+    log_listener.stop()
+    root_logger.removeHandler(queue_handler)
+
+app = FastAPI(
+    title="Visitor Parking Management API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson encodes datetimes natively and much faster than stdlib json
+)
 
 # Pydantic models for request/response
 
@@ -48,17 +111,37 @@ class VisitorResponse(BaseModel):
     unit_number: str
     status: str
     registered_at: datetime = Field(alias='created_at')
-    
-    class Config:
-        populate_by_name = True
-        allow_population_by_field_name = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class VisitorPage(BaseModel):
+    """One page of visitors plus the cursor for the next page (None on the last page)."""
+    items: List[VisitorResponse]
+    next_cursor: Optional[str] = None
+
+def parse_object_id(visitor_id: str) -> ObjectId:
+    """Path dependency: validate a visitor ID once and hand the parsed ObjectId to the handler."""
+    if not ObjectId.is_valid(visitor_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid visitor ID format.")
+    return ObjectId(visitor_id)
+
+def parse_cursor(after_id: Optional[str] = None) -> Optional[ObjectId]:
+    """Query dependency: parse the pagination cursor (a visitor ID) if one was given."""
+    if after_id is None:
+        return None
+    if not ObjectId.is_valid(after_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor format")
+    return ObjectId(after_id)
+
+async def invalidate_visitors_cache():
+    """Drop cached visitor listings after a write so the next GET sees fresh data."""
+    await FastAPICache.clear(namespace=VISITORS_CACHE_NAMESPACE)
 
 # --- Endpoints ---
 
+# Separate routes so GET and HEAD each get their own OpenAPI operation ID
 @app.get("/", tags=["Root"])
+@app.head("/", tags=["Root"])
 async def root():
     """Root endpoint that provides API information"""
     return {
@@ -80,7 +163,7 @@ async def create_visitor_endpoint(visitor: VisitorCreate):
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection failed.")
         
     # The database function now requires the IC_number
-    result, success = db.create_visitor(
+    result, success = await db.create_visitor(
         visitor.name, 
         visitor.ic_number, 
         visitor.license_plate, 
@@ -94,61 +177,86 @@ async def create_visitor_endpoint(visitor: VisitorCreate):
             detail=result.get("detail", "Failed to create visitor due to unknown error.")
         )
     
+    await invalidate_visitors_cache()
+
     # Returns the successful creation message and ID
     return result
 
-@app.get("/visitors/", response_model=List[VisitorResponse], tags=["Visitors"])
-async def get_all_visitors_endpoint():
-    """Retrieve a list of all registered visitors."""
+@app.post("/visitors/bulk", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED, tags=["Visitors"])
+async def create_visitors_bulk_endpoint(visitors: List[VisitorCreate]):
+    """
+    Register many visitors in one request (e.g. importing a visitor list).
+    Rows with a duplicate IC number or license plate are skipped and listed in "errors".
+    """
+    if db is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection failed.")
+
+    if not visitors or len(visitors) > MAX_BULK_VISITORS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Send between 1 and {MAX_BULK_VISITORS} visitors per request."
+        )
+
+    result, success = await db.create_visitors_bulk([visitor.model_dump() for visitor in visitors])
+
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("errors") or result.get("detail", "Failed to create visitors.")
+        )
+
+    await invalidate_visitors_cache()
+    return result
+
+@app.get("/visitors/stats", response_model=Dict[str, int], tags=["Visitors"])
+@cache(expire=VISITORS_CACHE_TTL, namespace=VISITORS_CACHE_NAMESPACE)
+async def get_visitor_stats_endpoint():
+    """Visitor counts by status (active, left, total) for the parking dashboard."""
+    if db is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection failed.")
+
+    result, success = await db.get_status_counts()
+
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result.get("detail", "Failed to count visitors.")
+        )
+
+    return result
+
+@app.get("/visitors/", response_model=None, responses={200: {"model": VisitorPage}}, tags=["Visitors"])
+@cache(expire=VISITORS_CACHE_TTL, namespace=VISITORS_CACHE_NAMESPACE)
+async def get_all_visitors_endpoint(
+    limit: int = Query(100, ge=1, le=MAX_VISITORS_PAGE_SIZE),
+    after_id: Optional[ObjectId] = Depends(parse_cursor)
+):
+    """
+    Retrieve a page of registered visitors, newest first.
+    Pass the returned next_cursor as after_id to fetch the following page.
+    """
     if db is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
             detail="Database connection failed."
         )
+
+    visitors, next_cursor = await db.get_all_visitors(limit, after_id)
     
-    visitors = db.get_all_visitors()
-    
-    # Convert the visitors data to match the response model
-    formatted_visitors = []
-    for visitor in visitors:
-        try:
-            # Convert _id to id and standardize field names
-            visitor_data = {
-                'id': str(visitor.pop('_id')),
-                'name': visitor.get('name', ''),
-                'ic_number': visitor.get('ic_number') or visitor.get('IC_number', ''),  # Try both field names
-                'license_plate': visitor.get('license_plate', ''),
-                'unit_number': visitor.get('unit_number', ''),
-                'status': visitor.get('status', 'Active'),
-            }
-
-            # Handle created_at datetime
-            created_at = visitor.get('created_at')
-            if isinstance(created_at, str) and created_at != 'N/A':
-                visitor_data['created_at'] = datetime.fromisoformat(created_at.replace(' ', 'T'))
-            elif isinstance(created_at, datetime):
-                visitor_data['created_at'] = created_at
-            else:
-                visitor_data['created_at'] = datetime.now(UTC)
-
-            # Only add visitor if required fields are present
-            if visitor_data['ic_number']:  # Skip visitors without IC numbers
-                formatted_visitors.append(visitor_data)
-            
-        except Exception as e:
-            print(f"Error processing visitor {visitor.get('_id', 'unknown')}: {e}")
-            continue
-    
-    return formatted_visitors
+    # Documents arrive already shaped by the projection (field names, defaults, string id)
+    # and constrained by the collection's $jsonSchema validator, so they are returned as-is:
+    # no per-document model or dict rebuild, just the list orjson serializes
+    return {"items": visitors, "next_cursor": next_cursor}
 
 @app.put("/visitors/{visitor_id}/status", response_model=Dict[str, Any], tags=["Visitors"])
-async def update_visitor_status_endpoint(visitor_id: str, status_data: VisitorStatusUpdate):
+async def update_visitor_status_endpoint(status_data: VisitorStatusUpdate,
+                                         visitor_id: ObjectId = Depends(parse_object_id)):
     """Update a visitor's status (Active or Left) using their ID."""
     if db is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection failed.")
         
     # Calls the specific update_visitor_status function
-    result, success = db.update_visitor_status(visitor_id, status_data.status)
+    result, success = await db.update_visitor_status(visitor_id, status_data.status)
     
     if not success:
         status_code = status.HTTP_404_NOT_FOUND if "not found" in result.get("detail", "") else status.HTTP_400_BAD_REQUEST
@@ -157,26 +265,44 @@ async def update_visitor_status_endpoint(visitor_id: str, status_data: VisitorSt
             detail=result.get("detail", "Failed to update visitor status.")
         )
     
+    await invalidate_visitors_cache()
     return result
 
-@app.delete("/visitors/{visitor_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Visitors"])
-async def delete_visitor_endpoint(visitor_id: str):
-    """Delete a visitor record using their ID."""
+@app.delete("/visitors/{visitor_id}", response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED, tags=["Visitors"])
+async def delete_visitor_endpoint(visitor_id: ObjectId = Depends(parse_object_id)):
+    """
+    Queue deletion of a visitor record using their ID.
+    The delete runs on a Celery worker; poll /tasks/{task_id} for the outcome.
+    """
     if db is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection failed.")
-        
-    result, success = db.delete_visitor(visitor_id)
-    
+
+    # Check up front so a missing visitor gets a 404 instead of a task that is bound to fail
+    exists, success = await db.visitor_exists(visitor_id)
     if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=result.get("detail", "Visitor not found or deletion failed.")
-        )
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error looking up visitor.")
+    if not exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Visitor not found.")
+
+    # Publishing to the broker is blocking I/O, so keep it off the event loop
+    task = await run_in_threadpool(delete_visitor_task.delay, str(visitor_id))
+    await invalidate_visitors_cache()
     
-    return 
+    return {"task_id": task.id}
+
+@app.get("/tasks/{task_id}", response_model=Dict[str, Any], tags=["Tasks"])
+async def get_task_status_endpoint(task_id: str):
+    """Check the status (and result, once finished) of a queued background task."""
+    task_status = await run_in_threadpool(get_task_status, task_id)
+    # The worker's own cache clear only reaches Redis; clear here too so a finished delete
+    # is never served from this process's cache (including the in-memory fallback)
+    result = task_status.get("result")
+    if isinstance(result, dict) and result.get("success"):
+        await invalidate_visitors_cache()
+    return task_status
 
 @app.put("/visitors/{visitor_id}", response_model=Dict[str, Any], tags=["Visitors"])
-async def update_visitor_endpoint(visitor_id: str, visitor: VisitorCreate):
+async def update_visitor_endpoint(visitor: VisitorCreate, visitor_id: ObjectId = Depends(parse_object_id)):
     """Update an existing visitor's details."""
     if db is None:
         raise HTTPException(
@@ -185,14 +311,7 @@ async def update_visitor_endpoint(visitor_id: str, visitor: VisitorCreate):
         )
     
     try:
-        # Validate ObjectId
-        if not ObjectId.is_valid(visitor_id):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid visitor ID format"
-            )
-        
-        result, success = db.update_visitor(
+        result, success = await db.update_visitor(
             visitor_id,
             visitor.name,
             visitor.ic_number,
@@ -206,6 +325,7 @@ async def update_visitor_endpoint(visitor_id: str, visitor: VisitorCreate):
                 detail=result.get("detail", "Failed to update visitor")
             )
             
+        await invalidate_visitors_cache()
         return {"detail": "Visitor updated successfully"}
         
     except Exception as e:
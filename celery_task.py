@@ -0,0 +1,59 @@
+from celery import Celery
+from celery.result import AsyncResult
+from dotenv import load_dotenv
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+from typing import Dict, Any, Optional
+from bson.objectid import ObjectId
+from database_task import DatabaseManager
+import asyncio
+import os
+
+load_dotenv()
+
+# Redis is shared by the Celery broker/result backend and the API's response cache
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+CACHE_PREFIX = "parking"
+VISITORS_CACHE_NAMESPACE = "visitors"
+
+celery_app = Celery("visitors", broker=REDIS_URL, backend=REDIS_URL)
+
+# One event loop + DatabaseManager per worker process, created on first use
+# (after the prefork pool has forked) and reused by every task
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_db: Optional[DatabaseManager] = None
+
+
+def get_worker_db() -> tuple[asyncio.AbstractEventLoop, DatabaseManager]:
+    """Return this worker process's event loop and DB manager, creating them once."""
+    global _loop, _db
+    if _db is None:
+        _loop = asyncio.new_event_loop()
+        _db = DatabaseManager()
+        FastAPICache.init(RedisBackend(aioredis.from_url(REDIS_URL)), prefix=CACHE_PREFIX)
+    return _loop, _db
+
+
+@celery_app.task(name="visitors.delete_visitor")
+def delete_visitor_task(visitor_id: str) -> Dict[str, Any]:
+    """Deletes a visitor record, then drops the API's cached visitor listings."""
+    loop, db = get_worker_db()
+    # The id travels through the broker as a string; the API has already validated it
+    result, success = loop.run_until_complete(db.delete_visitor(ObjectId(visitor_id)))
+    if success:
+        # Only reaches the API's cache when it runs on Redis; /tasks/{task_id} covers the in-memory fallback
+        loop.run_until_complete(FastAPICache.clear(namespace=VISITORS_CACHE_NAMESPACE))
+    return {"success": success, **result}
+
+
+def get_task_status(task_id: str) -> Dict[str, Any]:
+    """Reports the state of a queued task, plus its result once it has finished."""
+    task = AsyncResult(task_id, app=celery_app)
+    task_status = {"task_id": task_id, "status": task.status}
+    if task.ready():
+        task_status["result"] = task.result if task.successful() else str(task.result)
+    return task_status
+
+
+# Run a worker with: celery -A celery_task worker --loglevel=info
@@ -2,28 +2,105 @@
 Chatbot module for Parking Management System
 """
 
+import atexit
+import functools
 import os
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pymongo import MongoClient
 import re
+import threading
+import time
 
-load_dotenv()
+@functools.lru_cache(maxsize=1)
+def _env() -> dict:
+    """Load .env once per process and return the settings this module reads."""
+    load_dotenv()
+    return {
+        "api_key": os.getenv("GOOGLE_API_KEY"),
+        "model": os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),  # Default to gemini-1.5-flash
+        "mongo": os.getenv("MONGODB_ATLAS_CLUSTER_URI"),
+    }
 
-api_key = os.getenv("GOOGLE_API_KEY")
-model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")  # Default to gemini-1.5-flash
+
+api_key = _env()["api_key"]
+model = _env()["model"]
 
 if not api_key:
     raise ValueError("GOOGLE_API_KEY environment variable is not set")
 
-# Initialize LLM
+TOTAL_SPOTS = 105  # Parking capacity (update if needed)
+STATS_CACHE_SECONDS = 2  # Tools called within the same window share one stats query
+# Same collation as the status index built by database_task.init_database, so counts are index
+# lookups that match "active" and "Active" alike
+STATUS_COLLATION = {"locale": "en", "strength": 2}
+
+# One pooled client per process, shared by every tool call (connecting per call
+# costs a TCP/TLS handshake and topology discovery each time)
+_client = MongoClient(
+    _env()["mongo"],
+    maxPoolSize=20,
+    minPoolSize=2,
+    serverSelectionTimeoutMS=3000,
+)
+_collection = _client["parking_manager_db"]["visitors"]
+atexit.register(_client.close)
+
+# Server-side shaping for tool output: registration time arrives pre-formatted
+VISITOR_DISPLAY_PROJECTION = {
+    "$project": {
+        "_id": 0,
+        "name": 1,
+        "ic_number": 1,
+        "license_plate": 1,
+        "unit_number": 1,
+        "status": 1,
+        # $convert first: the chatbot can run before init_database migrates legacy string dates,
+        # and $dateToString would fail the whole aggregation on one of those
+        "created_at": {"$ifNull": [
+            {"$dateToString": {"format": "%Y-%m-%d %H:%M", "date": {"$convert": {
+                "input": "$created_at", "to": "date", "onError": None, "onNull": None
+            }}}}, "N/A"
+        ]},
+    }
+}
+
+# One visitor entry in visitors_data_from_db's listing
+_VISITOR_ROW_TEMPLATE = (
+    "\n**{i}. {name}**\n"
+    "   - 🪪 IC: {ic}\n"
+    "   - 🚗 Plate: {plate}\n"
+    "   - 🏢 Unit: {unit}\n"
+    "   - 📍 Status: {status}\n"
+    "   - 🕐 Registered: {registered}\n"
+)
+
+# Initialize LLM (one instance per process, so every chatbot reuses its client connection)
 llm = ChatGoogleGenerativeAI(
     model=model,
     api_key=api_key,
     temperature=0.3,
+    transport="rest",
+    timeout=30,
 )
 
+@functools.lru_cache(maxsize=1)
+def _fetch_stats_for(bucket: int) -> tuple:
+    """Count visitors per status from the status index; cached per time bucket by _fetch_stats."""
+    active = _collection.count_documents({"status": "active"}, collation=STATUS_COLLATION)
+    left = _collection.count_documents({"status": "left"}, collation=STATUS_COLLATION)
+    return active, left, _collection.estimated_document_count()
+
+
+def _fetch_stats() -> tuple:
+    """
+    Returns (active, left, total) visitor counts.
+    An agent often calls several stats tools in one turn, so results are reused for a couple of seconds.
+    """
+    return _fetch_stats_for(int(time.time() // STATS_CACHE_SECONDS))
+
+
 @tool
 def visitors_data_from_db(query: str) -> str:
     """
@@ -48,41 +125,34 @@ def visitors_data_from_db(query: str) -> str:
         A formatted string of visitors from the database or an error message
     """
     try:
-        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
-        db = client["parking_manager_db"]
-        collection = db["visitors"]
-
-        visitors = list(collection.find({}).limit(20))
-
-        if visitors:
-            result = [f"📋 **Total Visitors Found:** {len(visitors)}\n"]
-            
-            for i, visitor in enumerate(visitors, 1):
-                # Format datetime if available
-                reg_time = visitor.get('created_at', 'N/A')
-                if reg_time != 'N/A' and hasattr(reg_time, 'strftime'):
-                    reg_time = reg_time.strftime('%Y-%m-%d %H:%M')
-                elif reg_time != 'N/A':
-                    reg_time = str(reg_time)
-                
-                visitor_info = f"""
-**{i}. {visitor.get('name', 'N/A')}**
-   - 🪪 IC: {visitor.get('ic_number', 'N/A')}
-   - 🚗 Plate: {visitor.get('license_plate', 'N/A')}
-   - 🏢 Unit: {visitor.get('unit_number', 'N/A')}
-   - 📍 Status: {visitor.get('status', 'N/A').capitalize()}
-   - 🕐 Registered: {reg_time}
-"""
-                result.append(visitor_info)
-            
+        visitors = _collection.aggregate([
+            {"$sort": {"created_at": -1}},
+            {"$limit": 20},
+            VISITOR_DISPLAY_PROJECTION
+        ])
+
+        # Format rows as the cursor streams them in; the header is filled in once the count is known
+        result = [None]
+        for i, visitor in enumerate(visitors, 1):
+            get = visitor.get
+            result.append(_VISITOR_ROW_TEMPLATE.format(
+                i=i,
+                name=get('name', 'N/A'),
+                ic=get('ic_number', 'N/A'),
+                plate=get('license_plate', 'N/A'),
+                unit=get('unit_number', 'N/A'),
+                status=get('status', 'N/A').capitalize(),
+                registered=get('created_at', 'N/A'),
+            ))
+
+        if len(result) > 1:
+            result[0] = f"📋 **Total Visitors Found:** {len(result) - 1}\n"
             return "\n".join(result)
         else:
             return "No visitors found in the database."
             
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        client.close()
 
 
 @tool
@@ -96,34 +166,13 @@ def count_active_visitors(query: str) -> str:
     - How many parked?
     """
     try:
-        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
-        db = client["parking_manager_db"]
-        collection = db["visitors"]
-
-        # Check both lowercase and uppercase
-        active_count = collection.count_documents({"status": "active"})
-        if active_count == 0:
-            active_count = collection.count_documents({"status": "Active"})
-        
-        left_count = collection.count_documents({"status": "left"})
-        if left_count == 0:
-            left_count = collection.count_documents({"status": "Left"})
-        
-        total_count = collection.count_documents({})
-        total_spots = 105
-        available = total_spots - active_count
-        occupancy_rate = (active_count / total_spots * 100) if total_spots > 0 else 0
-                
-        # Assume 105 total spots (update if needed)
-        total_spots = 105
-        available = total_spots - active_count
+        active_count, _, total_count = _fetch_stats()
+        available = TOTAL_SPOTS - active_count
         
-        return f"Active visitors: {active_count}\nTotal registered: {total_count}\nAvailable spots: {available}/{total_spots}"
+        return f"Active visitors: {active_count}\nTotal registered: {total_count}\nAvailable spots: {available}/{TOTAL_SPOTS}"
         
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        client.close()
 
 
 @tool
@@ -137,16 +186,14 @@ def search_visitor_by_name(name: str) -> str:
     - Is X parked?
     """
     try:
-        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
-        db = client["parking_manager_db"]
-        collection = db["visitors"]
-
-        visitor = collection.find_one({"name": {"$regex": name, "$options": "i"}})
+        visitor = next(_collection.aggregate([
+            {"$match": {"name": {"$regex": name, "$options": "i"}}},
+            {"$limit": 1},
+            VISITOR_DISPLAY_PROJECTION
+        ]), None)
         
         if visitor:
             reg_time = visitor.get('created_at', 'N/A')
-            if reg_time != 'N/A' and hasattr(reg_time, 'strftime'):
-                reg_time = reg_time.strftime('%Y-%m-%d %H:%M')
             
             return f"""✅ Found visitor:
 👤 Name: {visitor.get('name', 'N/A')}
@@ -161,8 +208,6 @@ def search_visitor_by_name(name: str) -> str:
             
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        client.close()
 
 
 @tool
@@ -175,38 +220,32 @@ def get_visitors_by_unit(unit_number: str) -> str:
     - Who visited unit Y?
     """
     try:
-        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
-        db = client["parking_manager_db"]
-        collection = db["visitors"]
-
-        visitors = list(collection.find({"unit_number": unit_number}))
+        visitors = _collection.find(
+            {"unit_number": unit_number},
+            projection={"_id": 0, "name": 1, "license_plate": 1, "status": 1}
+        ).batch_size(50)
         
-        if visitors:
-            result = [f"Found {len(visitors)} visitors for unit {unit_number}:\n"]
-            for i, visitor in enumerate(visitors, 1):
-                result.append(
-                    f"{i}. {visitor.get('name')} - {visitor.get('license_plate')} ({visitor.get('status')})"
-                )
+        result = [None]
+        for i, visitor in enumerate(visitors, 1):
+            result.append(
+                f"{i}. {visitor.get('name')} - {visitor.get('license_plate')} ({visitor.get('status')})"
+            )
+
+        if len(result) > 1:
+            result[0] = f"Found {len(result) - 1} visitors for unit {unit_number}:\n"
             return "\n".join(result)
         else:
             return f"No visitors found for unit {unit_number}."
             
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        client.close()
 
 @tool
 def get_parking_summary(query: str) -> str:
     """Get a quick summary of parking status."""
     try:
-        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
-        db = client["parking_manager_db"]
-        collection = db["visitors"]
-
-        active = collection.count_documents({"status": {"$regex": "^active$", "$options": "i"}})
-        total_spots = 105
-        available = total_spots - active
+        active, _, _ = _fetch_stats()
+        available = TOTAL_SPOTS - active
         
         if available == 0:
             status = "🔴 PARKING FULL"
@@ -219,8 +258,6 @@ def get_parking_summary(query: str) -> str:
         
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        client.close()
 
 
 
@@ -236,106 +273,36 @@ tools = [
 
 # CHATBOT CLASS
 
-class ParkingChatbot:
-    """Main chatbot class for parking management."""
-    
-    def __init__(self):
-        """Initialize chatbot with LLM and tools."""
-        self.llm = llm
-        self.tools = tools
-        self.is_available = True if api_key else False
+def _keyword_re(keywords) -> re.Pattern:
+    """Compile keywords into one alternation regex (substring match, like `in`)."""
+    return re.compile('|'.join(map(re.escape, keywords)))
 
-    def _classify_intent(self, query: str) -> tuple:
-        """
-        Classify user intent from query.
-        Returns: (intent_type, extracted_data)
-        """
-        query_lower = query.lower()
-        
-        # 🆕 NEW: Detect "how-to" questions (instructional)
-        if any(phrase in query_lower for phrase in 
-               ['how can i', 'how do i', 'how to', 'what are the ways', 
-                'tell me how', 'explain how', 'show me how']):
-            return ('how_to', None)
-        
-        # Count/Stats intent
-        if any(word in query_lower for word in 
-               ['how many', 'count', 'stats', 'statistics', 'occupancy', 
-                'available', 'free', 'spots', 'capacity']):
-            return ('stats', None)
-        
-        # Status/Summary intent
-        if any(word in query_lower for word in 
-               ['status', 'summary', 'overview', 'situation', 'full', 'busy']):
-            return ('summary', None)
-        
-        # Search by name intent (only if NOT a how-to question)
-        if any(word in query_lower for word in 
-               ['search for', 'find visitor', 'locate visitor', 'look for visitor', 'where is', 'is there a visitor']):
-            # Extract name (capitalize first letter of each word)
-            words = query.split()
-            # Get words that are likely names (not common words)
-            exclude = {'search', 'find', 'for', 'visitor', 'named', 'called', 
-                      'the', 'a', 'an', 'is', 'there', 'where', 'who', 'locate',
-                      'how', 'can', 'i', 'do', 'to', 'tell', 'me', 'explain', 'show'}
-            names = [w.capitalize() for w in words 
-                    if len(w) > 2 and w.lower() not in exclude and not w.isdigit()]
-            if names:
-                return ('search', names[0])
-            return ('search', None)
-        
-        # Unit query intent
-        if any(word in query_lower for word in ['unit', 'apartment', 'flat']):
-            # Extract unit number (e.g., B-1-01, A-74, B1-09)
-            unit_pattern = r'[A-Z]-?\d+-?\d*'
-            matches = re.findall(unit_pattern, query.upper())
-            if matches:
-                return ('unit', matches[0])
-            # Try simpler pattern
-            words = query.split()
-            units = [w.upper() for w in words if any(c.isdigit() for c in w) and any(c.isalpha() for c in w)]
-            if units:
-                return ('unit', units[0])
-            return ('unit', None)
-        
-        # List all visitors intent
-        if any(word in query_lower for word in 
-               ['list', 'show all', 'display', 'view all', 'see all', 'visitors']):
-            return ('list', None)
-        
-        # Greeting
-        if any(word in query_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            return ('greeting', None)
-        
-        # Help
-        if any(word in query_lower for word in ['help', 'what can you', 'how to use']):
-            return ('help', None)
-        
-        return ('general', None)
-    
-    def get_response(self, query: str) -> str:
-        """
-        Get chatbot response for user query.
-        
-        Args:
-            query: User's question
-            
-        Returns:
-            Chatbot's response
-        """
-        if not self.is_available:
-            return "⚠️ Chatbot unavailable. Please check GOOGLE_API_KEY in .env file."
-        
-        try:
-            # Classify the user's intent
-            intent, extracted_data = self._classify_intent(query)
-            
-            # Handle different intents
-            if intent == 'greeting':
-                return "👋 Hello! I'm your parking assistant. I can help you with:\n• Checking parking availability\n• Finding specific visitors\n• Viewing visitor lists\n• Searching by unit number\n\nWhat would you like to know?"
-            
-            elif intent == 'help':
-                return """🤖 **How I can help you:**
+
+# Intent keywords, checked in this order by _classify_intent; one C-level scan per bucket
+_HOW_TO_RE = _keyword_re(('how can i', 'how do i', 'how to', 'what are the ways',
+                          'tell me how', 'explain how', 'show me how'))
+_STATS_RE = _keyword_re(('how many', 'count', 'stats', 'statistics', 'occupancy',
+                         'available', 'free', 'spots', 'capacity'))
+_SUMMARY_RE = _keyword_re(('status', 'summary', 'overview', 'situation', 'full', 'busy'))
+_SEARCH_RE = _keyword_re(('search for', 'find visitor', 'locate visitor', 'look for visitor',
+                          'where is', 'is there a visitor'))
+_UNIT_WORDS_RE = _keyword_re(('unit', 'apartment', 'flat'))
+_LIST_RE = _keyword_re(('list', 'show all', 'display', 'view all', 'see all', 'visitors'))
+_GREETING_RE = _keyword_re(('hello', 'hi', 'hey', 'greetings'))
+_HELP_RE = _keyword_re(('help', 'what can you', 'how to use'))
+
+# Words skipped when pulling a visitor name out of a search query
+_NAME_STOPWORDS = frozenset({'search', 'find', 'for', 'visitor', 'named', 'called',
+                             'the', 'a', 'an', 'is', 'there', 'where', 'who', 'locate',
+                             'how', 'can', 'i', 'do', 'to', 'tell', 'me', 'explain', 'show'})
+
+# Unit numbers such as B-1-01, A-74, B1-09
+_UNIT_RE = re.compile(r'[A-Z]-?\d+-?\d*')
+
+# Canned replies, built once
+_GREETING_REPLY = "👋 Hello! I'm your parking assistant. I can help you with:\n• Checking parking availability\n• Finding specific visitors\n• Viewing visitor lists\n• Searching by unit number\n\nWhat would you like to know?"
+
+_HELP_REPLY = """🤖 **How I can help you:**
 
 📊 **Check Statistics:**
 • "How many visitors are parked?"
@@ -356,11 +323,8 @@ class ParkingChatbot:
 • "Who visited unit A-74?"
 
 Just ask naturally!"""
-            
-            elif intent == 'how_to':
-                # 🆕 NEW: Handle instructional questions
-                if 'search' in query.lower() or 'find' in query.lower():
-                    return """🔍 **How to Search for Visitors:**
+
+_HOW_TO_SEARCH_REPLY = """🔍 **How to Search for Visitors:**
 
 You can search for visitors in several ways:
 
@@ -373,9 +337,8 @@ You can search for visitors in several ways:
    - Example: "Show visitors for unit B-1-01"
 
 Just ask me naturally and I'll help you find who you're looking for! 😊"""
-                
-                elif 'unit' in query.lower():
-                    return """🏢 **How to Find Visitors by Unit:**
+
+_HOW_TO_UNIT_REPLY = """🏢 **How to Find Visitors by Unit:**
 
 To find all visitors for a specific unit, you can:
 
@@ -386,9 +349,8 @@ To find all visitors for a specific unit, you can:
 2️⃣ **Use the View tab:** Go to "View All Visitors" and use the "Unit Number" filter dropdown
 
 I'll show you the name, license plate, and status of all visitors for that unit! 🚗"""
-                
-                else:
-                    return """💡 **General Instructions:**
+
+_HOW_TO_GENERAL_REPLY = """💡 **General Instructions:**
 
 I can help you with:
 • **Searching visitors** - Ask "How can I search for visitors?"
@@ -397,40 +359,11 @@ I can help you with:
 • **Viewing lists** - Just say "Show all visitors"
 
 What would you like to know? 😊"""
-            
-            elif intent == 'stats':
-                tool_result = count_active_visitors.invoke({"query": ""})
-                context = tool_result
-            
-            elif intent == 'summary':
-                tool_result = get_parking_summary.invoke({"query": ""})
-                context = tool_result
-            
-            elif intent == 'search':
-                if extracted_data:
-                    tool_result = search_visitor_by_name.invoke({"name": extracted_data})
-                    context = tool_result
-                else:
-                    return "🔍 Please specify a visitor name. Example: 'Find visitor John'"
-            
-            elif intent == 'unit':
-                if extracted_data:
-                    tool_result = get_visitors_by_unit.invoke({"unit_number": extracted_data})
-                    context = tool_result
-                else:
-                    return "🏢 Please specify a unit number. Example: 'Show visitors for unit B-1-01'"
-            
-            elif intent == 'list':
-                tool_result = visitors_data_from_db.invoke({"query": ""})
-                context = tool_result
-            
-            else:
-                # General query - let LLM decide
-                context = "I can help with visitor info, parking stats, and searching. Please ask about visitors, parking availability, or specific units."
-            
-            
-            # Generate response using LLM
-            prompt = f"""You are a friendly parking management assistant. Respond naturally and helpfully.
+
+_GENERAL_CONTEXT = "I can help with visitor info, parking stats, and searching. Please ask about visitors, parking availability, or specific units."
+
+# LLM prompt; filled with the tool context and the user's question
+_PROMPT_TEMPLATE = """You are a friendly parking management assistant. Respond naturally and helpfully.
 
 IMPORTANT: When you have visitor data, you MUST display it completely. Never summarize or say "followed by..." - always show the full list.
 
@@ -446,6 +379,153 @@ Instructions:
 - If no data is available, say so clearly
 
 Provide your response:"""
+
+_STATIC_REPLIES = {
+    'greeting': _GREETING_REPLY,
+    'help': _HELP_REPLY,
+}
+
+# Shown when a search/unit intent is detected but no name/unit could be extracted
+_MISSING_ARGUMENT_REPLIES = {
+    'search': "🔍 Please specify a visitor name. Example: 'Find visitor John'",
+    'unit': "🏢 Please specify a unit number. Example: 'Show visitors for unit B-1-01'",
+}
+
+# intent -> tool call producing the context passed to the LLM
+_TOOL_HANDLERS = {
+    'stats': lambda data: count_active_visitors.invoke({"query": ""}),
+    'summary': lambda data: get_parking_summary.invoke({"query": ""}),
+    'search': lambda data: search_visitor_by_name.invoke({"name": data}),
+    'unit': lambda data: get_visitors_by_unit.invoke({"unit_number": data}),
+    'list': lambda data: visitors_data_from_db.invoke({"query": ""}),
+}
+
+
+def _how_to_reply(query_lower: str) -> str:
+    """Pick the instructional reply for a how-to question."""
+    if 'search' in query_lower or 'find' in query_lower:
+        return _HOW_TO_SEARCH_REPLY
+    if 'unit' in query_lower:
+        return _HOW_TO_UNIT_REPLY
+    return _HOW_TO_GENERAL_REPLY
+
+
+@functools.lru_cache(maxsize=256)
+def _classify_query(query_lower: str) -> tuple:
+    """
+    Classify a lower-cased, stripped user query (cached).
+    Returns: (intent_type, extracted_data)
+    """
+    # 🆕 NEW: Detect "how-to" questions (instructional)
+    if _HOW_TO_RE.search(query_lower):
+        return ('how_to', None)
+    
+    # Count/Stats intent
+    if _STATS_RE.search(query_lower):
+        return ('stats', None)
+    
+    # Status/Summary intent
+    if _SUMMARY_RE.search(query_lower):
+        return ('summary', None)
+    
+    # Search by name intent (only if NOT a how-to question)
+    if _SEARCH_RE.search(query_lower):
+        # Extract name (capitalize first letter of each word)
+        words = query_lower.split()
+        # Get words that are likely names (not common words)
+        names = [w.capitalize() for w in words 
+                if len(w) > 2 and w.lower() not in _NAME_STOPWORDS and not w.isdigit()]
+        if names:
+            return ('search', names[0])
+        return ('search', None)
+    
+    # Unit query intent
+    if _UNIT_WORDS_RE.search(query_lower):
+        # Extract unit number (e.g., B-1-01, A-74, B1-09)
+        matches = _UNIT_RE.findall(query_lower.upper())
+        if matches:
+            return ('unit', matches[0])
+        # Try simpler pattern
+        words = query_lower.split()
+        units = [w.upper() for w in words if any(c.isdigit() for c in w) and any(c.isalpha() for c in w)]
+        if units:
+            return ('unit', units[0])
+        return ('unit', None)
+    
+    # List all visitors intent
+    if _LIST_RE.search(query_lower):
+        return ('list', None)
+    
+    # Greeting
+    if _GREETING_RE.search(query_lower):
+        return ('greeting', None)
+    
+    # Help
+    if _HELP_RE.search(query_lower):
+        return ('help', None)
+    
+    return ('general', None)
+
+
+class ParkingChatbot:
+    """Main chatbot class for parking management."""
+    
+    def __init__(self, llm_polish: bool = False):
+        """
+        Initialize chatbot with LLM and tools.
+        With llm_polish, tool results are rewritten by the LLM instead of returned as-is.
+        """
+        self.llm = llm
+        self.tools = tools
+        self.is_available = True if api_key else False
+        self.llm_polish = llm_polish
+
+    def _classify_intent(self, query: str) -> tuple:
+        """
+        Classify user intent from query.
+        Returns: (intent_type, extracted_data)
+        """
+        # Classification is case-insensitive, so repeat questions hit the cache
+        return _classify_query(query.lower().strip())
+    
+    def get_response(self, query: str) -> str:
+        """
+        Get chatbot response for user query.
+        
+        Args:
+            query: User's question
+            
+        Returns:
+            Chatbot's response
+        """
+        if not self.is_available:
+            return "⚠️ Chatbot unavailable. Please check GOOGLE_API_KEY in .env file."
+        
+        try:
+            # Classify the user's intent
+            intent, extracted_data = self._classify_intent(query)
+            
+            # Canned replies need no data and no LLM call
+            if intent in _STATIC_REPLIES:
+                return _STATIC_REPLIES[intent]
+            if intent == 'how_to':
+                return _how_to_reply(query.lower())
+            if not extracted_data and intent in _MISSING_ARGUMENT_REPLIES:
+                return _MISSING_ARGUMENT_REPLIES[intent]
+
+            # Data intents fetch their context from a tool; the tools already format
+            # their output for the user, so skip the LLM round trip unless asked to polish
+            handler = _TOOL_HANDLERS.get(intent)
+            if handler:
+                context = handler(extracted_data)
+                if not self.llm_polish:
+                    return context
+            else:
+                # General query - let LLM decide
+                context = _GENERAL_CONTEXT
+            
+            # Generate response using LLM
+            prompt = _PROMPT_TEMPLATE.format(context=context, query=query)
             
             response = self.llm.invoke(prompt)
             return response.content
@@ -454,14 +534,17 @@ Provide your response:"""
             return f"Error: {str(e)}"
 
 
-# Singleton instance
+# Singleton instance (the lock keeps concurrent first calls from building two)
 _chatbot_instance = None
+_chatbot_lock = threading.Lock()
 
 def get_chatbot() -> ParkingChatbot:
     """Get or create chatbot instance."""
     global _chatbot_instance
     if _chatbot_instance is None:
-        _chatbot_instance = ParkingChatbot()
+        with _chatbot_lock:
+            if _chatbot_instance is None:
+                _chatbot_instance = ParkingChatbot()
     return _chatbot_instance
 
 
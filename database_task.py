@@ -1,175 +1,331 @@
-from pymongo import MongoClient
-from datetime import datetime
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from datetime import datetime, UTC
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
-from typing import Tuple, Dict, Any, List    
+from functools import lru_cache
+from typing import Tuple, Dict, Any, List, Optional
+import asyncio
+import logging
 import os
 
-load_dotenv()
 
-mongo_uri = os.getenv('MONGODB_ATLAS_CLUSTER_URI')
+@lru_cache(maxsize=1)
+def _env() -> Dict[str, Optional[str]]:
+    """Load .env once per process and return the settings this module reads."""
+    load_dotenv()
+    return {"mongo": os.getenv('MONGODB_ATLAS_CLUSTER_URI')}
+
+
+logger = logging.getLogger(__name__)
+
+# Set once init_database has run in this process; the migrations and index builds
+# only need to happen once, not for every DatabaseManager
+_database_initialized = False
+
+# Connection pool sized for bursty async traffic; one DatabaseManager (and so one
+# client) is created per process. zstd falls back to zlib if zstandard is missing.
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": 100,
+    "minPoolSize": 10,
+    "maxIdleTimeMS": 60_000,
+    "serverSelectionTimeoutMS": 3_000,
+    "connectTimeoutMS": 5_000,
+    "compressors": "zstd,zlib",
+}
+
+# Server-side shaping for the visitor listing: ObjectId -> string id and default status.
+# created_at is always a BSON date (see init_database); it leaves as a fixed-format UTC string
+# so cached and uncached API responses serialize it identically.
+VISITOR_RESPONSE_PROJECTION = {
+    "$project": {
+        "_id": 0,
+        "id": {"$toString": "$_id"},
+        "name": {"$ifNull": ["$name", ""]},
+        "ic_number": 1,
+        "license_plate": {"$ifNull": ["$license_plate", ""]},
+        "unit_number": {"$ifNull": ["$unit_number", ""]},
+        "status": {"$ifNull": ["$status", "Active"]},
+        "created_at": {"$dateToString": {"format": "%Y-%m-%dT%H:%M:%S", "date": "$created_at"}},
+    }
+}
+
+# Enforced by init_database so every stored visitor can be read without fallbacks
+VISITOR_SCHEMA = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["name", "ic_number", "license_plate", "unit_number", "status", "created_at"],
+        "properties": {
+            "name": {"bsonType": "string"},
+            "ic_number": {"bsonType": "string", "minLength": 1},
+            "license_plate": {"bsonType": "string", "minLength": 1},
+            "unit_number": {"bsonType": "string"},
+            "status": {"bsonType": "string"},
+            "created_at": {"bsonType": "date"},
+        },
+    }
+}
+
+# Stored by the created_at migration when a legacy value can't be parsed, so those rows stay
+# recognisable instead of looking freshly registered
+UNKNOWN_CREATED_AT = datetime(1970, 1, 1, tzinfo=UTC)
+
+# Status values are stored as both "active" and "Active"; status queries pass this collation so
+# one equality match covers either spelling and is answered from the status index built with it
+STATUS_COLLATION = {"locale": "en", "strength": 2}
+
+# Human-readable names for the unique-indexed fields, used in duplicate-key messages
+UNIQUE_FIELD_LABELS = {"ic_number": "IC number", "license_plate": "license plate"}
+
+
+def duplicate_field_label(error: DuplicateKeyError) -> str:
+    """Names the unique field that caused a duplicate-key error."""
+    key_pattern = (error.details or {}).get("keyPattern", {})
+    return next((UNIQUE_FIELD_LABELS[f] for f in key_pattern if f in UNIQUE_FIELD_LABELS), "IC number or license plate")
+
+
+def build_visitor_document(name: str, ic_number: str, license_plate: str, unit_number: str) -> Dict[str, Any]:
+    """Builds a new visitor record with standardized fields."""
+    return {
+        "name": name,
+        "ic_number": ic_number.upper(),  # Note: consistent field name
+        "license_plate": license_plate.upper(),
+        "unit_number": unit_number,
+        "created_at": datetime.now(UTC),
+        "status": "active"
+    }
 
 
 class DatabaseManager:
     """
     Manages all CRUD operations for visitor parking records in MongoDB.
     """
-    def __init__(self, db_name='parking_manager_db', connection_string: str = mongo_uri):
+    def __init__(self, db_name='parking_manager_db', connection_string: Optional[str] = None,
+                 client: Optional[AsyncMongoClient] = None):
         """
-        Initializes the MongoDB connection and collections.
-        (Note: Connection errors are handled externally or by MongoClient)
+        Initializes the async MongoDB client and collections.
+        Pass an existing `client` to share its connection pool; otherwise one is created
+        for `connection_string` (default: MONGODB_ATLAS_CLUSTER_URI).
+        The client connects lazily, so call `await init_database()` before serving requests.
+        (Note: Connection errors are handled externally or by AsyncMongoClient)
         """
-        self.client = MongoClient(connection_string)
+        self.client = client or AsyncMongoClient(connection_string or _env()["mongo"], **MONGO_CLIENT_OPTIONS)
         self.db = self.client[db_name]
         self.visitors_collection = self.db.visitors
-        self.init_database()
 
-    def init_database(self):
-        """Initialize database with collections and indexes."""
-        # Drop existing indexes first
-        self.visitors_collection.drop_indexes()
-        
+    async def ping(self):
+        """Round-trip to the server so the pool opens its first connections before traffic."""
+        await self.client.admin.command("ping")
+
+    async def init_database(self):
+        """
+        Initialize database with collections, indexes and schema validation.
+        Runs at most once per process; create_index is idempotent, so existing indexes are left as they are.
+        """
+        global _database_initialized
+        if _database_initialized:
+            return
+
+        # One-time migration: legacy documents stored the IC under "IC_number"
+        await self.visitors_collection.update_many(
+            {"IC_number": {"$exists": True}},
+            [{"$set": {"ic_number": {"$ifNull": ["$ic_number", "$IC_number"]}}}, {"$unset": "IC_number"}]
+        )
+
+        # One-time migration: older writers stored created_at as a formatted string (or not at all)
+        await self.visitors_collection.update_many(
+            {"created_at": {"$not": {"$type": "date"}}},
+            [{"$set": {"created_at": {"$convert": {
+                "input": "$created_at", "to": "date",
+                "onError": UNKNOWN_CREATED_AT, "onNull": UNKNOWN_CREATED_AT
+            }}}}]
+        )
+        unknown_dates = await self.visitors_collection.count_documents({"created_at": UNKNOWN_CREATED_AT})
+        if unknown_dates:
+            logger.warning("%d visitor(s) have no recoverable created_at; stored as %s",
+                           unknown_dates, UNKNOWN_CREATED_AT.date())
+
         # Create unique indexes with consistent field names
-        self.visitors_collection.create_index("ic_number", unique=True)
-        self.visitors_collection.create_index("license_plate", unique=True)
-        self.visitors_collection.create_index("unit_number")
+        await self.visitors_collection.create_index("ic_number", unique=True)
+        await self.visitors_collection.create_index("license_plate", unique=True)
+        await self.visitors_collection.create_index("unit_number")
+        await self.visitors_collection.create_index("status", collation=STATUS_COLLATION)
+
+        # Serves the chatbot's "latest visitors" read (sort by created_at desc, limit 20); the API
+        # listing pages on _id. A (status, created_at) index waits for a status-filtered sorted query.
+        await self.visitors_collection.create_index([("created_at", -1)])
 
-    def create_visitor(self, name: str, ic_number: str, license_plate: str, unit_number: str) -> tuple[dict, bool]:
+        # Reject new writes that would bring back missing/legacy fields. collMod needs a privilege
+        # the app's user may not have; the API still works without the validator, so carry on.
+        try:
+            await self.db.command(
+                "collMod", self.visitors_collection.name,
+                validator=VISITOR_SCHEMA,
+                validationLevel="moderate"
+            )
+        except Exception as e:
+            logger.warning("Could not install the visitors schema validator, continuing without it: %s", e)
+        _database_initialized = True
+
+    async def create_visitor(self, name: str, ic_number: str, license_plate: str, unit_number: str) -> tuple[dict, bool]:
         try:
             # Validate input
             if not ic_number or not license_plate:
                 return {"detail": "IC number and license plate are required"}, False
             
-            # Print debug info
-            print(f"Trying to insert - IC: {ic_number}, Plate: {license_plate}")
+            logger.debug("Inserting visitor IC=%s plate=%s", ic_number, license_plate)
             
-            # Check for existing visitor with case-insensitive search
-            existing = self.visitors_collection.find_one({
-                "$or": [
-                    {"ic_number": ic_number.upper()},
-                    {"license_plate": license_plate.upper()}
-                ]
-            })
-
-            if existing:
-                duplicate_field = "IC number" if existing.get("ic_number") == ic_number.upper() else "license plate"
-                return {"detail": f"Visitor with this {duplicate_field} already exists"}, False
-
             # Create new visitor with standardized fields
-            new_visitor = {
-                "name": name,
-                "ic_number": ic_number.upper(),  # Note: consistent field name
-                "license_plate": license_plate.upper(),
-                "unit_number": unit_number,
-                "created_at": datetime.now(),
-                "status": "active"
-            }
-
-            result = self.visitors_collection.insert_one(new_visitor)
+            new_visitor = build_visitor_document(name, ic_number, license_plate, unit_number)
+
+            # The unique indexes reject duplicates, so no pre-insert lookup is needed
+            result = await self.visitors_collection.insert_one(new_visitor)
             return {
                 "detail": "Visitor created successfully",
                 "visitor_id": str(result.inserted_id)
             }, True     
 
+        except DuplicateKeyError as e:
+            return {"detail": f"Visitor with this {duplicate_field_label(e)} already exists"}, False
         except Exception as e:
-            print(f"Database error details: {str(e)}")  # Debug print
+            logger.exception("create_visitor failed")
             return {"detail": f"Database error: {str(e)}"}, False
         
-    def get_all_visitors(self) -> List[Dict[str, Any]]:
-        """Retrieves all visitor records, converting ObjectId to string"""
+    async def create_visitors_bulk(self, visitors: List[Dict[str, str]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Inserts many visitors in a single round trip.
+        Unordered, so one duplicate does not stop the rest of the batch; failed rows are reported by index.
+        """
+        new_visitors = [
+            build_visitor_document(v["name"], v["ic_number"], v["license_plate"], v["unit_number"])
+            for v in visitors
+        ]
+        errors = []
         try:
-            # Sort by creation time, newest first
-            visitors = list(self.visitors_collection.find().sort("created_at", -1))
-            
-            # Convert ObjectID to string and format datetime
-            for visitor in visitors:
-                visitor['_id'] = str(visitor['_id'])
-                # Handle datetime formatting safely
-                if 'created_at' in visitor:
-                    visitor['created_at'] = visitor['created_at'].strftime('%Y-%m-%d %H:%M')
+            await self.visitors_collection.insert_many(new_visitors, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                if write_error.get("code") == 11000:
+                    label = duplicate_field_label(DuplicateKeyError(write_error.get("errmsg", ""), 11000, write_error))
+                    detail = f"Visitor with this {label} already exists"
                 else:
-                    visitor['created_at'] = "N/A"
-            return visitors
+                    detail = write_error.get("errmsg", "Write failed")
+                errors.append({"index": write_error["index"], "detail": detail})
         except Exception as e:
-            print(f"Error fetching visitors: {e}")
-            return []
+            logger.exception("create_visitors_bulk failed")
+            return {"detail": f"Database error: {str(e)}"}, False
+
+        # insert_many assigns _id client-side, so every row that did not fail was inserted
+        failed = {error["index"] for error in errors}
+        visitor_ids = [str(doc["_id"]) for i, doc in enumerate(new_visitors) if i not in failed]
+        return {
+            "detail": f"{len(visitor_ids)} of {len(new_visitors)} visitors created",
+            "inserted_count": len(visitor_ids),
+            "visitor_ids": visitor_ids,
+            "errors": errors
+        }, len(visitor_ids) > 0
+
+    async def get_status_counts(self) -> Tuple[Dict[str, int], bool]:
+        """
+        Counts visitors per status from the status index (STATUS_COLLATION, so "Active" == "active").
+        Returns {"active": n, "left": n, "total": n} for the dashboard.
+        """
+        try:
+            active, left, total = await asyncio.gather(
+                self.visitors_collection.count_documents({"status": "active"}, collation=STATUS_COLLATION),
+                self.visitors_collection.count_documents({"status": "left"}, collation=STATUS_COLLATION),
+                self.visitors_collection.estimated_document_count()
+            )
+            return {"active": active, "left": left, "total": total}, True
+        except Exception as e:
+            logger.exception("get_status_counts failed")
+            return {"detail": f"Database error: {str(e)}"}, False
+
+    async def get_all_visitors(self, limit: int = 100,
+                               after_id: Optional[ObjectId] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Retrieves one page of visitor records, newest first, shaped for the API's VisitorResponse.
+        Returns the page and the cursor to pass as `after_id` for the next one (None on the last page).
+        """
+        try:
+            # Keyset pagination: ObjectIds grow with insertion time, so "_id < cursor" walks
+            # newest-to-oldest using the _id index instead of skipping over earlier pages
+            pipeline = []
+            if after_id:
+                pipeline.append({"$match": {"_id": {"$lt": after_id}}})
+            pipeline += [{"$sort": {"_id": -1}}, {"$limit": limit}, VISITOR_RESPONSE_PROJECTION]
+
+            cursor = await self.visitors_collection.aggregate(pipeline)
+            visitors = await cursor.to_list(length=None)
+            next_cursor = visitors[-1]["id"] if len(visitors) == limit else None
+            return visitors, next_cursor
+        except Exception:
+            logger.exception("get_all_visitors failed")
+            return [], None
         
-    def update_visitor(self, visitor_id: str, name: str, ic_number: str, 
+    async def update_visitor(self, visitor_object_id: ObjectId, name: str, ic_number: str, 
                   license_plate: str, unit_number: str) -> tuple[dict, bool]:
         """Update visitor details in database."""
         try:
-            # Convert string ID to ObjectId
-            visitor_object_id = ObjectId(visitor_id)
-            
-            # Check if visitor exists
-            existing = self.visitors_collection.find_one({"_id": visitor_object_id})
-            if not existing:
-                return {"detail": "Visitor not found"}, False
-                
-            # Check if IC/license plate is taken by another visitor
-            duplicate = self.visitors_collection.find_one({
-                "_id": {"$ne": visitor_object_id},
-                "$or": [
-                    {"ic_number": ic_number},
-                    {"license_plate": license_plate}
-                ]
-            })
-            
-            if duplicate:
-                field = "IC number" if duplicate.get("ic_number") == ic_number else "license plate"
-                return {"detail": f"This {field} is already registered"}, False
-                
-            # Update visitor
-            result = self.visitors_collection.update_one(
+            # One round trip: a missing visitor shows up as matched_count == 0, and an IC/plate
+            # taken by another visitor is rejected by the unique indexes
+            result = await self.visitors_collection.update_one(
                 {"_id": visitor_object_id},
                 {"$set": {
                     "name": name,
                     "ic_number": ic_number,
                     "license_plate": license_plate,
                     "unit_number": unit_number,
-                    "updated_at": datetime.now()
+                    "updated_at": datetime.now(UTC)
                 }}
             )
+            if result.matched_count == 0:
+                return {"detail": "Visitor not found"}, False
             
             return (
                 {"detail": "Visitor updated successfully"},
                 result.modified_count > 0
             )
             
+        except DuplicateKeyError as e:
+            return {"detail": f"This {duplicate_field_label(e)} is already registered"}, False
         except Exception as e:
             return {"detail": f"Error updating visitor: {str(e)}"}, False
 
-    def update_visitor_status(self, visitor_id: str, new_status: str) -> Tuple[Dict[str, Any], bool]:
+    async def update_visitor_status(self, visitor_object_id: ObjectId, new_status: str) -> Tuple[Dict[str, Any], bool]:
         """Updates the status of a specific visitor"""
         try:
-            if not ObjectId.is_valid(visitor_id):
-                return {"detail": "Invalid visitor ID format."}, False
-            
-            visitor_object_id = ObjectId(visitor_id)
-            
-            result = self.visitors_collection.update_one(
+            # Update and read back the new status in one round trip
+            visitor = await self.visitors_collection.find_one_and_update(
                 {"_id": visitor_object_id},
                 {"$set": {
                     "status": new_status,
-                    "last_updated": datetime.now()
-                }}
+                    "last_updated": datetime.now(UTC)
+                }},
+                projection={"_id": 0, "status": 1},
+                return_document=ReturnDocument.AFTER
             )
 
-            if result.modified_count > 0:
-                return {"message": "Visitor status updated successfully"}, True
-            return {"detail": "Visitor not found or status already set."}, False
+            if visitor:
+                return {"message": "Visitor status updated successfully", "status": visitor["status"]}, True
+            return {"detail": "Visitor not found."}, False
 
         except Exception as e:
             return {"detail": f"Error updating visitor status: {str(e)}"}, False
 
-    def delete_visitor(self, visitor_id: str) -> Tuple[Dict[str, Any], bool]:
-        """Deletes a visitor record by ID"""
+    async def visitor_exists(self, visitor_object_id: ObjectId) -> Tuple[bool, bool]:
+        """Checks whether a visitor with this ID is stored. Returns (exists, success)."""
         try:
-            if not ObjectId.is_valid(visitor_id):
-                return {"detail": "Invalid visitor ID format."}, False
+            count = await self.visitors_collection.count_documents({"_id": visitor_object_id}, limit=1)
+            return count > 0, True
+        except Exception:
+            logger.exception("visitor_exists failed")
+            return False, False
 
-            visitor_object_id = ObjectId(visitor_id)
-            result = self.visitors_collection.delete_one({"_id": visitor_object_id})
+    async def delete_visitor(self, visitor_object_id: ObjectId) -> Tuple[Dict[str, Any], bool]:
+        """Deletes a visitor record by ID"""
+        try:
+            result = await self.visitors_collection.delete_one({"_id": visitor_object_id})
             
             if result.deleted_count > 0:
                 return {"message": "Visitor deleted successfully"}, True
@@ -179,9 +335,9 @@ class DatabaseManager:
             return {"detail": f"Error deleting visitor: {str(e)}"}, False
 
 
-    def close_connection(self):
+    async def close_connection(self):
         """Closes the MongoDB connection."""
-        self.client.close()
+        await self.client.close()
         
 
 # --- Interactive CLI Menu for Local Testing ---
@@ -200,11 +356,12 @@ def display_menu():
     print("6. Exit")
     print("-"*40)
 
-def main():
+async def main():
     """Main interactive CLI function."""
     try:
         # Initialize the database manager instance
         db = DatabaseManager()
+        await db.init_database()
         print("Connected to MongoDB successfully!")
     except Exception as e:
         print(f"Failed to connect to MongoDB: {e}")
@@ -222,7 +379,7 @@ def main():
             license_plate = input("Enter license plate (Unique): ").strip()
             unit_number = input("Enter unit number visiting: ").strip()
 
-            result, success = db.create_visitor(name, ic_number, license_plate, unit_number)
+            result, success = await db.create_visitor(name, ic_number, license_plate, unit_number)
             if success:
                 print(f"✅ Success! Visitor ID: {result.get('visitor_id')}")
             else:
@@ -230,28 +387,34 @@ def main():
 
         elif choice == '2':
             print("\n--- All Visitors ---")
-            visitors = db.get_all_visitors()
+            visitors, cursor = await db.get_all_visitors()
+            while cursor:
+                page, cursor = await db.get_all_visitors(after_id=ObjectId(cursor))
+                visitors.extend(page)
             if visitors:
                 for v in visitors:
-                    print(f"ID: {v['_id'][:8]}... | "
+                    print(f"ID: {v['id'][:8]}... | "
                           f"Plate: {v['license_plate']} | "
                           f"Name: {v['name']} | "
                           f"Unit: {v['unit_number']} | "
                           f"Status: {v['status']} | "
-                          f"Created: {v['created_at']}")  # Datetime is already formatted
+                          f"Created: {v['created_at'][:16].replace('T', ' ')}")
             else:
                 print("No visitors found.")
 
         elif choice == '3':
             print("\n--- Update Visitor Status ---")
             visitor_id = input("Enter Visitor ID to update status: ").strip()
+            if not ObjectId.is_valid(visitor_id):
+                print("Invalid visitor ID format.")
+                continue
             new_status = input("Enter new status (Active/Left): ").strip()
             
             if new_status not in ["Active", "Left"]:
                 print("Invalid status. Must be 'Active' or 'Left'.")
                 continue
 
-            result, success = db.update_visitor_status(visitor_id, new_status)
+            result, success = await db.update_visitor_status(ObjectId(visitor_id), new_status)
             if success:
                 print(f"✅ Status updated successfully for ID {visitor_id}")
             else:
@@ -260,13 +423,16 @@ def main():
         elif choice == '4': 
             print("\n--- Edit Visitor Details ---")
             visitor_id = input("Enter Visitor ID to edit: ").strip()
+            if not ObjectId.is_valid(visitor_id):
+                print("Invalid visitor ID format.")
+                continue
             name = input("Enter new visitor name: ").strip()
             ic_number = input("Enter new IC Number (Unique): ").strip()
             license_plate = input("Enter new license plate (Unique): ").strip()
             unit_number = input("Enter new unit number visiting: ").strip()
 
-            result, success = db.update_visitor(
-                visitor_id,
+            result, success = await db.update_visitor(
+                ObjectId(visitor_id),
                 name,
                 ic_number,
                 license_plate,
@@ -280,9 +446,12 @@ def main():
         elif choice == '5':
             print("\n--- Delete Visitor ---")
             visitor_id = input("Enter Visitor ID to delete: ").strip()
+            if not ObjectId.is_valid(visitor_id):
+                print("Invalid visitor ID format.")
+                continue
             confirm = input(f"Are you sure you want to delete record {visitor_id}? (y/n): ")
             if confirm.lower() == 'y':
-                result, success = db.delete_visitor(visitor_id)
+                result, success = await db.delete_visitor(ObjectId(visitor_id))
                 if success:
                     print("✅ Visitor deleted successfully!")
                 else:
@@ -292,7 +461,7 @@ def main():
 
         elif choice == '6':
             print("\nClosing database connection.. Goodbye!")
-            db.close_connection()
+            await db.close_connection()
             break
 
         else:
@@ -301,4 +470,4 @@ def main():
         input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
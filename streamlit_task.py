@@ -1,24 +1,63 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import orjson
+import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from typing import List, Dict, Any
-from datetime import datetime
-import time
-
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = time.time()
-if 'refresh_interval' not in st.session_state:
-    st.session_state.refresh_interval = 5  # Refresh every 5 second
+from datetime import datetime, timezone
+import threading
 
 API_BASE_URL = "http://localhost:8000" 
 STATUS_OPTIONS = ["active", "left"]  
 TOTAL_PARKING_SPOTS = 105
+VISITORS_PAGE_SIZE = 500  # max page size accepted by GET /visitors/
+VISITORS_CACHE_TTL = 30  # seconds; writes below clear the cache straight away
+DASHBOARD_REFRESH_SECONDS = 5  # the dashboard re-polls its stats on this timer
+API_PROBE_TTL = 10  # seconds a successful API liveness check is reused
+REQUEST_TIMEOUT = (1, 5)  # (connect, read) seconds, so a stuck API can't hang the script
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One pooled session per Streamlit server, shared by every user session and rerun."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=Retry(total=2, backoff_factor=0.1)
+    ))
+    return session
+
+# Every API call goes through the shared session, keeping connections to the API alive
+SESSION = get_http_session()
+
+def parse_json(response: requests.Response) -> Any:
+    """Decode an API response body with orjson (much faster than response.json() on long lists)."""
+    return orjson.loads(response.content)
+
+def send_json(method, url: str, payload: Dict[str, Any]) -> requests.Response:
+    """Send a JSON body encoded with orjson."""
+    return method(
+        url,
+        data=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=REQUEST_TIMEOUT
+    )
+
+@st.cache_data(ttl=API_PROBE_TTL, show_spinner=False)
+def probe_api() -> bool:
+    """HEAD the API root (no body); raises if unreachable so a failed probe is retried next rerun."""
+    response = SESSION.head(f"{API_BASE_URL}/", timeout=0.5)
+    response.raise_for_status()
+    return True
 
 def check_api_connection():
     """Check if the FastAPI server is running and accessible."""
     try:
-        response = requests.get(f"{API_BASE_URL}/") 
-        return response.status_code == 200
+        return probe_api()
     except:
         return False
     
@@ -55,38 +94,22 @@ def search_and_filter_visitors(visitors: List[Dict[str, Any]],
         filtered = [v for v in filtered if v.get('unit_number', '') == unit_filter]
     
     # Filter by date range
-    if date_from or date_to:
-        date_filtered = []
-        for v in filtered:
-            try:
-                # Handle both string and datetime objects
-                reg_datetime = v.get('created_at')
-                if isinstance(reg_datetime, str):
-                    reg_date = pd.to_datetime(reg_datetime).date()
-                else:
-                    reg_date = pd.to_datetime(reg_datetime).date()
-                
-                # Check date range
-                include = True
-                if date_from and date_to:
-                    # Both dates selected
-                    if not (date_from <= reg_date <= date_to):
-                        include = False
-                elif date_from:
-                    # Only from date
-                    if reg_date < date_from:
-                        include = False
-                elif date_to:
-                    # Only to date
-                    if reg_date > date_to:
-                        include = False
-                
-                if include:
-                    date_filtered.append(v)
-            except Exception as e:
-                # If date parsing fails, skip this visitor
-                continue
-        filtered = date_filtered
+    if (date_from or date_to) and filtered:
+        # Parse every registration date in one vectorized call, floored to the day
+        # (stays datetime64); unparseable dates become NaT and are skipped
+        reg_dates = pd.to_datetime(
+            pd.Series([v.get('created_at') for v in filtered], dtype=object),
+            format='mixed',
+            utc=True,
+            errors='coerce'
+        ).dt.tz_localize(None).dt.floor('D')
+        
+        include = reg_dates.notna()
+        if date_from:
+            include &= reg_dates >= pd.Timestamp(date_from)
+        if date_to:
+            include &= reg_dates <= pd.Timestamp(date_to)
+        filtered = [v for v, keep in zip(filtered, include) if keep]
     
     return filtered
 
@@ -172,16 +195,63 @@ def display_search_filters(visitors: List[Dict[str, Any]]):
         st.info(f"📊 Showing {len(filtered_visitors)} of {len(visitors)} visitors")
     
     return filtered_visitors
+@st.cache_data(ttl=VISITORS_CACHE_TTL, show_spinner=False)
+def fetch_all_visitors() -> List[Dict[str, Any]]:
+    """
+    Fetch all visitors via API, following the pagination cursor page by page.
+    Cached across reruns; raises on failure so errors are never cached.
+    """
+    visitors = []
+    params = {"limit": VISITORS_PAGE_SIZE}
+    while True:
+        response = SESSION.get(f"{API_BASE_URL}/visitors/", params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        page = parse_json(response)
+        visitors.extend(page["items"])
+        if not page.get("next_cursor"):
+            return visitors
+        params["after_id"] = page["next_cursor"]
+
 def get_all_visitors() -> List[Dict[str, Any]]:
-    """Get all visitors via API."""
+    """Get all visitors via API (served from the rerun cache when fresh)."""
     try: 
-        response = requests.get(f"{API_BASE_URL}/visitors/")
-        if response.status_code == 200:
-            return response.json(), True
-        return [], False
+        return fetch_all_visitors(), True
     except:
         return [], False
 
+@st.cache_data(ttl=DASHBOARD_REFRESH_SECONDS, show_spinner=False)
+def fetch_visitor_stats() -> Dict[str, int]:
+    """Fetch visitor counts by status; raises on failure so errors are never cached."""
+    response = SESSION.get(f"{API_BASE_URL}/visitors/stats", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return parse_json(response)
+
+def get_visitor_stats():
+    """Get active/left/total visitor counts for the dashboard in one small request."""
+    try:
+        return fetch_visitor_stats(), True
+    except:
+        return {}, False
+
+def load_session_visitors():
+    """Return this session's visitor list, fetching it from the API only the first time it's needed."""
+    if 'visitors' not in st.session_state:
+        visitors, success = get_all_visitors()
+        if not success:
+            return [], False
+        st.session_state.visitors = visitors
+        mark_visitors_changed()
+    return st.session_state.visitors, True
+
+def mark_visitors_changed():
+    """Record that rows were added to or removed from the session's visitor list (see edit_and_manage_visitor_form)."""
+    st.session_state.visitors_version = st.session_state.get('visitors_version', 0) + 1
+
+def clear_visitor_caches():
+    """Drop cached visitor data after a write so the next rerun sees it."""
+    fetch_all_visitors.clear()
+    fetch_visitor_stats.clear()
+
 def create_visitor(name: str, ic_number: str, license_plate: str, unit_number: str):
     """
     Register a new visitor via API. 
@@ -194,22 +264,22 @@ def create_visitor(name: str, ic_number: str, license_plate: str, unit_number: s
         "unit_number": unit_number
     }
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/visitors/",
-            json=payload
-        )
-        return response.json(), response.status_code == 201
+        response = send_json(SESSION.post, f"{API_BASE_URL}/visitors/", payload)
+        success = response.status_code == 201
+        if success:
+            clear_visitor_caches()
+        return parse_json(response), success
     except Exception as e:
         return {"error": str(e)}, False
 
 def update_visitor_status(visitor_id: str, new_status: str):
     """Update an existing visitor's status via API."""
     try:
-        response = requests.put(
-            f"{API_BASE_URL}/visitors/{visitor_id}/status",
-            json={"status": new_status}
-        )
-        return response.json(), response.status_code == 200
+        response = send_json(SESSION.put, f"{API_BASE_URL}/visitors/{visitor_id}/status", {"status": new_status})
+        success = response.status_code == 200
+        if success:
+            clear_visitor_caches()
+        return parse_json(response), success
     except Exception as e:
         return {"error": str(e)}, False
 
@@ -222,28 +292,30 @@ def edit_visitor(visitor_id: str, name: str, ic_number: str, license_plate: str,
         "unit_number": unit_number
     }
     try:
-        response = requests.put(
-            f"{API_BASE_URL}/visitors/{visitor_id}",
-            json=payload
-        )
+        response = send_json(SESSION.put, f"{API_BASE_URL}/visitors/{visitor_id}", payload)
         if response.status_code == 200:
-            return response.json(), True
+            clear_visitor_caches()
+            return parse_json(response), True
         else:
-            return response.json(), False
+            return parse_json(response), False
     except Exception as e:
         return {"error": str(e)}, False
 
 def delete_visitor(visitor_id: str):
     """Delete a visitor record via API."""
     try: 
-        response = requests.delete(f"{API_BASE_URL}/visitors/{visitor_id}")
-        return {}, response.status_code == 204
+        response = SESSION.delete(f"{API_BASE_URL}/visitors/{visitor_id}", timeout=REQUEST_TIMEOUT)
+        # Deletion is queued on the API's background worker
+        success = response.status_code == 202
+        if success:
+            clear_visitor_caches()
+        return parse_json(response), success
     except Exception as e:
         return {"error": str(e)}, False
 
 # --- STREAMLIT PAGE FUNCTIONS (Build the UI) ---
 
-def display_dashboard(visitors: List[Dict[str, Any]]):
+def display_dashboard(stats: Dict[str, int]):
     """Display parking availability dashboard with charts and stats."""
     
     col_header, col_refresh = st.columns([4, 1])
@@ -251,12 +323,13 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         st.header("📊 Parking Dashboard")
     with col_refresh:
         if st.button("🔄 Refresh", key="refresh_dashboard"):
-            st.rerun()
+            clear_visitor_caches()
+            st.rerun(scope="fragment")
     
-    # Calculate statistics - case insensitive status check
-    total_visitors = len(visitors)
-    active_visitors = len([v for v in visitors if v['status'].lower() == 'active'])
-    left_visitors = len([v for v in visitors if v['status'].lower() == 'left'])
+    # Statistics are counted by the API (status case folded server-side)
+    total_visitors = stats.get('total', 0)
+    active_visitors = stats.get('active', 0)
+    left_visitors = stats.get('left', 0)
     available_spots = TOTAL_PARKING_SPOTS - active_visitors
     occupancy_rate = (active_visitors / TOTAL_PARKING_SPOTS * 100) if TOTAL_PARKING_SPOTS > 0 else 0
     
@@ -307,8 +380,6 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         # Color coding
         colors = ["#FF6B6B", "#51CF66"]
         
-        import plotly.graph_objects as go
-        
         fig = go.Figure(data=[go.Pie(
             labels=occupancy_data['Status'],
             values=occupancy_data['Count'],
@@ -367,25 +438,28 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         st.success(f"✅ Parking available - {available_spots} spots free!")
     
     
-def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = True):
-    """Displays all visitors in a styled table format."""
-    
-    if not visitors:
-        st.info("No visitors registered yet.")
-        return
-    
-    # 🆕 NEW: Add search and filters
-    if show_filters:
-        filtered_visitors = display_search_filters(visitors)
-    else:
-        filtered_visitors = visitors
-    
-    if not filtered_visitors:
-        st.warning("No visitors match your search criteria.")
-        return
-        
+# Column display settings shared by the visitor tables
+VISITOR_TABLE_COLUMNS = {
+    "Status": st.column_config.TextColumn(
+        "Status", 
+        help="Current visitor status", 
+        width="small"
+    ),
+    "Registered At": st.column_config.DatetimeColumn(
+        "Registered At",
+        format="YYYY-MM-DD HH:mm"
+    )
+}
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_visitor_table(visitors: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the display DataFrame for the visitor table.
+    Cached on the visitor rows themselves, so an unchanged list (e.g. on auto-refresh)
+    skips the DataFrame build and date parsing, and changed data is never served stale.
+    """
     # Convert list of dicts to DataFrame for better display
-    df = pd.DataFrame(filtered_visitors)
+    df = pd.DataFrame(visitors)
     
     # Handle both 'id' and '_id' field names from API
     id_field = 'id' if 'id' in df.columns else '_id'
@@ -405,17 +479,15 @@ def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = T
     rename_dict = {k: v for k, v in column_mapping.items() if k in df.columns}
     df = df.rename(columns=rename_dict)
 
-    # Format datetime if the column exists
+    # Parse datetime if the column exists; display formatting is left to the
+    # DatetimeColumn in VISITOR_TABLE_COLUMNS (done client-side, no per-row strftime)
     if 'Registered At' in df.columns:
         try:
-            df['Registered At'] = df['Registered At'].astype(str)
             df['Registered At'] = pd.to_datetime(
                 df['Registered At'],
                 format='mixed',
                 utc=True
-            )
-            df['Registered At'] = df['Registered At'].dt.tz_localize(None)
-            df['Registered At'] = df['Registered At'].dt.strftime('%Y-%m-%d %H:%M')
+            ).dt.tz_localize(None)
         except Exception as e:
             st.warning(f"Error formatting dates: {e}")
             df['Registered At'] = df['Registered At'].astype(str)
@@ -431,18 +503,44 @@ def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = T
         'Registered At'
     ] if col in df.columns]
     
+    return df[display_columns]
+
+
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+def dashboard_fragment():
+    """Dashboard tab; refreshes on its own timer without rerunning the rest of the page."""
+    stats, success = get_visitor_stats()
+    if success:
+        display_dashboard(stats)
+    else:
+        st.error("Failed to retrieve visitor statistics from API.")
+
+
+def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = True):
+    """Displays all visitors in a styled table format."""
+    
+    if not visitors:
+        st.info("No visitors registered yet.")
+        return
+    
+    # 🆕 NEW: Add search and filters
+    if show_filters:
+        filtered_visitors = display_search_filters(visitors)
+    else:
+        filtered_visitors = visitors
+    
+    if not filtered_visitors:
+        st.warning("No visitors match your search criteria.")
+        return
+        
+    df = build_visitor_table(filtered_visitors)
+    
     # Display the dataframe
     st.dataframe(
-        df[display_columns],
+        df,
         hide_index=True,
         use_container_width=True,
-        column_config={
-            "Status": st.column_config.TextColumn(
-                "Status", 
-                help="Current visitor status", 
-                width="small"
-            )
-        }
+        column_config=VISITOR_TABLE_COLUMNS
     )
 
 def create_visitor_form():
@@ -470,6 +568,18 @@ def create_visitor_form():
             if all([name, ic_number, license_plate, unit_number]):
                 result, success = create_visitor(name, ic_number, license_plate, unit_number)
                 if success:
+                    # Apply the new record locally (as the API stores it) instead of re-fetching the list
+                    if 'visitors' in st.session_state:
+                        mark_visitors_changed()
+                        st.session_state.visitors.insert(0, {
+                            "id": result.get('visitor_id'),
+                            "name": name,
+                            "ic_number": ic_number.upper(),
+                            "license_plate": license_plate.upper(),
+                            "unit_number": unit_number,
+                            "status": "active",
+                            "created_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+                        })
                     st.success(f"Visitor registered successfully! ID: {result.get('visitor_id')[:8]}...")
                     st.toast("Registration Complete!", icon="🎉")
                     # Clear the detected plate from session
@@ -482,117 +592,178 @@ def create_visitor_form():
                 st.error("All fields are required.")
 
 def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
-    """Combined interface to edit, update status, or delete visitors with card-style UI."""
+    """Pick a visitor from the table, then edit, update status, or delete it in a single detail card."""
     st.header("⚙️ Edit & Manage Visitors")
     
     # Handle both 'id' and '_id' field names
     id_field = 'id' if 'id' in visitors[0] else '_id'
     
-    # Display visitors in expandable cards
-    for visitor in visitors:
-        visitor_id = visitor[id_field]
+    # One selectable table instead of a card (and its widgets) per visitor. Its selection is a
+    # row position, so the key is versioned with the list: any insert/delete/reload starts a
+    # fresh table instead of leaving the old position pointing at a different visitor
+    selection = st.dataframe(
+        build_visitor_table(visitors),
+        hide_index=True,
+        use_container_width=True,
+        column_config=VISITOR_TABLE_COLUMNS,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"manage_visitor_table_{st.session_state.get('visitors_version', 0)}"
+    )
+    
+    # Remember the pick by id; every action below looks the visitor up by that id
+    selected_rows = selection.selection.rows
+    if selected_rows and selected_rows[0] < len(visitors):
+        st.session_state.manage_selected_id = visitors[selected_rows[0]][id_field]
+    else:
+        st.session_state.pop('manage_selected_id', None)
+    
+    visitor = next(
+        (v for v in visitors if v[id_field] == st.session_state.get('manage_selected_id')),
+        None
+    )
+    if visitor is None:
+        st.info("👆 Select a visitor in the table to edit, change status, or delete.")
+        return
+    
+    visitor_id = visitor[id_field]
+    
+    with st.container(border=True):
+        st.subheader(f"🚗 {visitor['name']} | {visitor['license_plate']} | Status: {visitor['status'].capitalize()}")
         
-        # Create an expander for each visitor (card-style)
-        with st.expander(
-            f"🚗 {visitor['name']} | {visitor['license_plate']} | Status: {visitor['status'].capitalize()}",
-            expanded=False
-        ):
-            # Show visitor details
-            col_info1, col_info2 = st.columns(2)
-            
-            with col_info1:
-                st.markdown(f"**👤 Name:** {visitor['name']}")
-                st.markdown(f"**🪪 IC Number:** {visitor['ic_number']}")
-            
-            with col_info2:
-                st.markdown(f"**🚘 License Plate:** {visitor['license_plate']}")
-                st.markdown(f"**🏠 Unit Number:** {visitor['unit_number']}")
+        # Show visitor details
+        col_info1, col_info2 = st.columns(2)
+    
+        with col_info1:
+            st.markdown(f"**👤 Name:** {visitor['name']}")
+            st.markdown(f"**🪪 IC Number:** {visitor['ic_number']}")
+    
+        with col_info2:
+            st.markdown(f"**🚘 License Plate:** {visitor['license_plate']}")
+            st.markdown(f"**🏠 Unit Number:** {visitor['unit_number']}")
+    
+        st.markdown(f"**📊 Status:** :blue[{visitor['status'].capitalize()}]")
+        st.markdown(f"**🕐 Registered:** {visitor.get('created_at', 'N/A')}")
+    
+        st.divider()
+    
+        # Create tabs within the card for Edit/Status/Delete
+        tab_edit, tab_status, tab_delete = st.tabs(["✏️ Edit Details", "🔄 Change Status", "🗑️ Delete"])
+    
+        with tab_edit:
+            with st.form(f"edit_form_{visitor_id}"):
+                st.markdown("##### Edit Visitor Information")
+                col1, col2 = st.columns(2)
             
-            st.markdown(f"**📊 Status:** :blue[{visitor['status'].capitalize()}]")
-            st.markdown(f"**🕐 Registered:** {visitor.get('created_at', 'N/A')}")
+                with col1:
+                    new_name = st.text_input("Name", value=visitor['name'], key=f"name_{visitor_id}")
+                    new_plate = st.text_input("License Plate", value=visitor['license_plate'], key=f"plate_{visitor_id}")
             
-            st.divider()
+                with col2:
+                    new_ic = st.text_input("IC Number", value=visitor['ic_number'], key=f"ic_{visitor_id}")
+                    new_unit = st.text_input("Unit Number", value=visitor['unit_number'], key=f"unit_{visitor_id}")
             
-            # Create tabs within each card for Edit/Status/Delete
-            tab_edit, tab_status, tab_delete = st.tabs(["✏️ Edit Details", "🔄 Change Status", "🗑️ Delete"])
+                submit_edit = st.form_submit_button("💾 Save Changes", type="primary")
             
-            with tab_edit:
-                with st.form(f"edit_form_{visitor_id}"):
-                    st.markdown("##### Edit Visitor Information")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        new_name = st.text_input("Name", value=visitor['name'], key=f"name_{visitor_id}")
-                        new_plate = st.text_input("License Plate", value=visitor['license_plate'], key=f"plate_{visitor_id}")
-                    
-                    with col2:
-                        new_ic = st.text_input("IC Number", value=visitor['ic_number'], key=f"ic_{visitor_id}")
-                        new_unit = st.text_input("Unit Number", value=visitor['unit_number'], key=f"unit_{visitor_id}")
-                    
-                    submit_edit = st.form_submit_button("💾 Save Changes", type="primary")
-                    
-                    if submit_edit:
-                        if all([new_name, new_ic, new_plate, new_unit]):
-                            result, success = edit_visitor(visitor_id, new_name, new_ic, new_plate, new_unit)
-                            if success:
-                                st.success("✅ Details updated successfully!")
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Update failed: {result.get('detail', 'Unknown error')}")
+                if submit_edit:
+                    if all([new_name, new_ic, new_plate, new_unit]):
+                        result, success = edit_visitor(visitor_id, new_name, new_ic, new_plate, new_unit)
+                        if success:
+                            visitor.update({
+                                "name": new_name,
+                                "ic_number": new_ic,
+                                "license_plate": new_plate,
+                                "unit_number": new_unit
+                            })
+                            st.success("✅ Details updated successfully!")
+                            st.rerun()
                         else:
-                            st.error("All fields are required.")
-            
-            with tab_status:
-                st.markdown("##### Change Visitor Status")
-                current_status = visitor['status'].lower()
-                
-                col_status1, col_status2 = st.columns([2, 1])
-                
-                with col_status1:
-                    new_status = st.radio(
-                        "Select new status:",
-                        options=STATUS_OPTIONS,
-                        format_func=str.capitalize,
-                        index=STATUS_OPTIONS.index(current_status),
-                        key=f"status_{visitor_id}",
-                        horizontal=True
-                    )
-                
-                with col_status2:
-                    if st.button("🔄 Update Status", key=f"update_status_{visitor_id}", type="primary"):
-                        result, success = update_visitor_status(visitor_id, new_status)
+                            st.error(f"❌ Update failed: {result.get('detail', 'Unknown error')}")
+                    else:
+                        st.error("All fields are required.")
+    
+        with tab_status:
+            st.markdown("##### Change Visitor Status")
+            current_status = visitor['status'].lower()
+        
+            col_status1, col_status2 = st.columns([2, 1])
+        
+            with col_status1:
+                new_status = st.radio(
+                    "Select new status:",
+                    options=STATUS_OPTIONS,
+                    format_func=str.capitalize,
+                    index=STATUS_OPTIONS.index(current_status),
+                    key=f"status_{visitor_id}",
+                    horizontal=True
+                )
+        
+            with col_status2:
+                if st.button("🔄 Update Status", key=f"update_status_{visitor_id}", type="primary"):
+                    result, success = update_visitor_status(visitor_id, new_status)
+                    if success:
+                        visitor['status'] = new_status
+                        st.success(f"✅ Status updated to '{new_status.capitalize()}'")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ Failed: {result.get('detail', 'Unknown error')}")
+    
+        with tab_delete:
+            st.markdown("##### Delete Visitor Record")
+            st.warning("⚠️ **Warning:** This action is permanent and cannot be undone!")
+        
+            col_del1, col_del2, col_del3 = st.columns([1, 1, 2])
+        
+            with col_del1:
+                if st.button("🗑️ Delete", key=f"delete_{visitor_id}", type="secondary"):
+                    if st.session_state.get('confirm_delete') != visitor_id:
+                        st.session_state['confirm_delete'] = visitor_id
+        
+            with col_del2:
+                if st.session_state.get('confirm_delete') == visitor_id:
+                    if st.button("✅ Confirm Delete", key=f"confirm_delete_{visitor_id}", type="primary"):
+                        result, success = delete_visitor(visitor_id)
                         if success:
-                            st.success(f"✅ Status updated to '{new_status.capitalize()}'")
+                            st.session_state.visitors = [
+                                v for v in st.session_state.visitors if v[id_field] != visitor_id
+                            ]
+                            mark_visitors_changed()
+                            st.session_state['confirm_delete'] = None
+                            st.success("✅ Visitor deleted successfully!")
                             st.rerun()
                         else:
                             st.error(f"❌ Failed: {result.get('detail', 'Unknown error')}")
-            
-            with tab_delete:
-                st.markdown("##### Delete Visitor Record")
-                st.warning("⚠️ **Warning:** This action is permanent and cannot be undone!")
-                
-                col_del1, col_del2, col_del3 = st.columns([1, 1, 2])
-                
-                with col_del1:
-                    if st.button("🗑️ Delete", key=f"delete_{visitor_id}", type="secondary"):
-                        if st.session_state.get('confirm_delete') != visitor_id:
-                            st.session_state['confirm_delete'] = visitor_id
-                
-                with col_del2:
-                    if st.session_state.get('confirm_delete') == visitor_id:
-                        if st.button("✅ Confirm Delete", key=f"confirm_delete_{visitor_id}", type="primary"):
-                            result, success = delete_visitor(visitor_id)
-                            if success:
-                                st.session_state['confirm_delete'] = None
-                                st.success("✅ Visitor deleted successfully!")
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Failed: {result.get('detail', 'Unknown error')}")
-                
-                with col_del3:
-                    if st.session_state.get('confirm_delete') == visitor_id:
-                        st.error("👈 Click 'Confirm Delete' to proceed")
+        
+            with col_del3:
+                if st.session_state.get('confirm_delete') == visitor_id:
+                    st.error("👈 Click 'Confirm Delete' to proceed")
+
 
+# Each tab is its own fragment, so widget events rerun only that tab;
+# the register tab never touches the visitor list
+@st.fragment
+def register_fragment():
+    create_visitor_form()
+
+@st.fragment
+def view_visitors_fragment():
+    visitors, success = load_session_visitors()
+    if not success:
+        st.error("Failed to retrieve visitors from API.")
+        return
+    st.header(f"📋 All Registered Visitors ({len(visitors)})")
+    display_visitor_table(visitors)
+
+@st.fragment
+def manage_visitors_fragment():
+    visitors, success = load_session_visitors()
+    if not success:
+        st.error("Failed to retrieve visitors from API.")
+        return
+    if visitors:
+        edit_and_manage_visitor_form(visitors)
+    else:
+        st.info("No visitors to manage yet. Please register one first.")
 
 def main():
     st.set_page_config(
@@ -605,20 +776,35 @@ def main():
     st.title("🚗  Parking Management System")
     st.markdown("🛡️ Register, track, and manage all visitors.🛡️")
 
-    # 1. Check API Connection
-    if not check_api_connection():
+    # 1. Check API Connection and load visitors concurrently (independent requests);
+    # workers get this script's context so st.cache_data works inside them
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=2,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    ) as executor:
+        connected_future = executor.submit(check_api_connection)
+        # The session keeps its own visitor list once loaded (writes are applied to it locally)
+        visitors_future = None if 'visitors' in st.session_state else executor.submit(get_all_visitors)
+
+    if not connected_future.result():
         st.error("🛑 Cannot connect to FastAPI. Please ensure the backend is running on http://localhost:8002.")
         st.info("Run: python api_task.py")
         return
     
     st.success("✅ WELCOME! CONNECTED TO FASTAPI.")
 
-    # Load visitors first
-    visitors, success = get_all_visitors()
-    
-    if not success:
-        st.error("Failed to retrieve visitors from API.")
-        return
+    if visitors_future is not None:
+        visitors, success = visitors_future.result()
+        # On failure the data tabs retry (and report) through load_session_visitors
+        if success:
+            st.session_state.visitors = visitors
+            mark_visitors_changed()
+    
+    if st.button("🔄 Reload visitors", key="reload_visitors"):
+        clear_visitor_caches()
+        st.session_state.pop('visitors', None)
+        st.rerun()
 
     # Update tabs
     tab_register, tab_dashboard, tab_view, tab_manage = st.tabs([
@@ -629,20 +815,16 @@ def main():
     ])
     
     with tab_dashboard:
-        display_dashboard(visitors)
+        dashboard_fragment()
 
     with tab_register:
-        create_visitor_form()
+        register_fragment()
 
     with tab_view:
-        st.header(f"📋 All Registered Visitors ({len(visitors)})")
-        display_visitor_table(visitors)
+        view_visitors_fragment()
             
     with tab_manage:
-        if visitors:
-            edit_and_manage_visitor_form(visitors)
-        else:
-            st.info("No visitors to manage yet. Please register one first.")
+        manage_visitors_fragment()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
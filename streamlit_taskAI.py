@@ -1,79 +1,144 @@
+import os
+# Tesseract's OpenMP threading only adds overhead on small plate images; the
+# tesseract subprocess started by pytesseract inherits this setting
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-from typing import List, Dict, Any
+import plotly.graph_objects as go
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import time
 import pytesseract
-from PIL import Image
 import cv2
 import numpy as np
 import re
-
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = time.time()
-if 'refresh_interval' not in st.session_state:
-    st.session_state.refresh_interval = 5  # Refresh every 5 second
+import threading
 
 API_BASE_URL = "http://localhost:8000" 
 STATUS_OPTIONS = ["active", "left"]  
 TOTAL_PARKING_SPOTS = 200
+VISITORS_PAGE_SIZE = 500  # max page size accepted by GET /visitors/
+OCR_MAX_HEIGHT = 200  # px; larger uploads are shrunk to this height before preprocessing
+VISITORS_CACHE_TTL = 5  # seconds, matching DASHBOARD_REFRESH_SECONDS; writes below clear the cache straight away
+DASHBOARD_REFRESH_SECONDS = 5  # the dashboard re-polls visitors on this timer
+API_PROBE_TTL = 30  # seconds a successful API liveness check is reused
+REQUEST_TIMEOUT = (1, 5)  # (connect, read) seconds, so a stuck API can't hang the script
+DELETE_WAIT_SECONDS = 5  # how long a delete waits for its background task before reloading anyway
+TASK_POLL_INTERVAL = 0.25  # seconds between /tasks/{task_id} polls
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One pooled session per Streamlit server, keeping connections to the API alive across reruns."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=2, backoff_factor=0.1)
+    ))
+    return session
+
+SESSION = get_http_session()
 
 # Optional: Set Tesseract path (uncomment and modify if needed)
 # For Windows: pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 # For Mac (if not in PATH): pytesseract.pytesseract.tesseract_cmd = r'/opt/homebrew/bin/tesseract'
 
-def extract_license_plate(image):
-    """Extract license plate text from uploaded image using OCR."""
+# LSTM engine only, one word per image, no dictionary lookups (plates aren't words).
+# For the fastest reads, install eng.traineddata from https://github.com/tesseract-ocr/tessdata_fast
+# into Tesseract's tessdata directory.
+TESSERACT_CONFIG = (
+    r'--oem 1 --psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    r' -c load_system_dawg=0 -c load_freq_dawg=0'
+)
+
+# CLAHE objects keep internal buffers, so each script thread reuses its own
+# instead of allocating one per scan (sharing one across threads isn't safe)
+_clahe_local = threading.local()
+
+def get_clahe():
+    """Return this thread's reusable CLAHE contrast enhancer."""
+    if not hasattr(_clahe_local, "clahe"):
+        _clahe_local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    return _clahe_local.clahe
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def read_license_plate(image_bytes: bytes) -> str:
+    """OCR the plate in an encoded image; cached on the raw bytes and raises on failure so errors are never cached."""
+    # Decode straight to grayscale (no PIL copy, no colour conversion)
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Unsupported or corrupt image file")
+    
+    # Shrink large photos first so every filter and Tesseract see far fewer pixels
+    height, width = gray.shape
+    if height > OCR_MAX_HEIGHT:
+        scale = OCR_MAX_HEIGHT / height
+        gray = cv2.resize(gray, (max(1, int(width * scale)), OCR_MAX_HEIGHT), interpolation=cv2.INTER_AREA)
+    
+    # Apply preprocessing to improve OCR accuracy
+    # 1. Denoise (bilateral filter keeps character edges sharp and is far cheaper than non-local means)
+    denoised = cv2.bilateralFilter(gray, d=9, sigmaColor=75, sigmaSpace=75)
+    
+    # 2. Increase contrast
+    contrast = get_clahe().apply(denoised)
+    
+    # 3. Apply threshold
+    _, thresh = cv2.threshold(contrast, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    
+    # Use Tesseract to extract text
+    text = pytesseract.image_to_string(thresh, config=TESSERACT_CONFIG)
+    
+    # Clean up the extracted text
+    plate_text = text.strip().upper()
+    # Remove spaces and special characters
+    plate_text = re.sub(r'[^A-Z0-9]', '', plate_text)
+    
+    return plate_text
+
+def extract_license_plate(image_bytes: bytes) -> Optional[str]:
+    """Extract license plate text from an uploaded image using OCR."""
     try:
-        # Convert PIL image to numpy array for OpenCV
-        img_array = np.array(image)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
-        # Apply preprocessing to improve OCR accuracy
-        # 1. Denoise
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        
-        # 2. Increase contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        contrast = clahe.apply(denoised)
-        
-        # 3. Apply threshold
-        _, thresh = cv2.threshold(contrast, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Use Tesseract to extract text
-        # Config for license plates (alphanumeric, limited characters)
-        custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        text = pytesseract.image_to_string(thresh, config=custom_config)
-        
-        # Clean up the extracted text
-        plate_text = text.strip().upper()
-        # Remove spaces and special characters
-        plate_text = re.sub(r'[^A-Z0-9]', '', plate_text)
-        
-        return plate_text if plate_text else None
-        
+        return read_license_plate(image_bytes) or None
     except Exception as e:
         st.error(f"OCR Error: {str(e)}")
         return None
 
+@st.cache_data(ttl=API_PROBE_TTL, show_spinner=False)
+def probe_api() -> bool:
+    """HEAD the API root (no body); raises if unreachable so a failed probe is retried next rerun."""
+    response = SESSION.head(f"{API_BASE_URL}/", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return True
+
 def check_api_connection():
     """Check if the FastAPI server is running and accessible."""
     try:
-        response = requests.get(f"{API_BASE_URL}/") 
-        return response.status_code == 200
+        return probe_api()
     except:
         return False
     
+@st.cache_data(ttl=VISITORS_CACHE_TTL, show_spinner=False)
+def fetch_all_visitors() -> List[Dict[str, Any]]:
+    """Fetch every visitor, following the pagination cursor; raises on failure so errors are never cached."""
+    visitors = []
+    params = {"limit": VISITORS_PAGE_SIZE}
+    while True:
+        response = SESSION.get(f"{API_BASE_URL}/visitors/", params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        page = response.json()
+        visitors.extend(page["items"])
+        if not page.get("next_cursor"):
+            return visitors
+        params["after_id"] = page["next_cursor"]
+
 def get_all_visitors() -> List[Dict[str, Any]]:
-    """Get all visitors via API."""
+    """Get all visitors via API (served from the rerun cache when fresh)."""
     try: 
-        response = requests.get(f"{API_BASE_URL}/visitors/")
-        if response.status_code == 200:
-            return response.json(), True
-        return [], False
+        return fetch_all_visitors(), True
     except:
         return [], False
 
@@ -89,22 +154,30 @@ def create_visitor(name: str, ic_number: str, license_plate: str, unit_number: s
         "unit_number": unit_number
     }
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{API_BASE_URL}/visitors/",
-            json=payload
+            json=payload,
+            timeout=REQUEST_TIMEOUT
         )
-        return response.json(), response.status_code == 201
+        success = response.status_code == 201
+        if success:
+            fetch_all_visitors.clear()
+        return response.json(), success
     except Exception as e:
         return {"error": str(e)}, False
 
 def update_visitor_status(visitor_id: str, new_status: str):
     """Update an existing visitor's status via API."""
     try:
-        response = requests.put(
+        response = SESSION.put(
             f"{API_BASE_URL}/visitors/{visitor_id}/status",
-            json={"status": new_status}
+            json={"status": new_status},
+            timeout=REQUEST_TIMEOUT
         )
-        return response.json(), response.status_code == 200
+        success = response.status_code == 200
+        if success:
+            fetch_all_visitors.clear()
+        return response.json(), success
     except Exception as e:
         return {"error": str(e)}, False
 
@@ -117,28 +190,78 @@ def edit_visitor(visitor_id: str, name: str, ic_number: str, license_plate: str,
         "unit_number": unit_number
     }
     try:
-        response = requests.put(
+        response = SESSION.put(
             f"{API_BASE_URL}/visitors/{visitor_id}",
-            json=payload
+            json=payload,
+            timeout=REQUEST_TIMEOUT
         )
         if response.status_code == 200:
+            fetch_all_visitors.clear()
             return response.json(), True
         else:
             return response.json(), False
     except Exception as e:
         return {"error": str(e)}, False
 
+def wait_for_task(task_id: str) -> tuple[Dict[str, Any], bool]:
+    """Poll a queued API task until it finishes (or DELETE_WAIT_SECONDS pass); returns (result, finished)."""
+    deadline = time.monotonic() + DELETE_WAIT_SECONDS
+    while True:
+        response = SESSION.get(f"{API_BASE_URL}/tasks/{task_id}", timeout=REQUEST_TIMEOUT)
+        task_status = response.json()
+        if "result" in task_status:
+            return task_status["result"], True
+        if time.monotonic() >= deadline:
+            return task_status, False
+        time.sleep(TASK_POLL_INTERVAL)
+
 def delete_visitor(visitor_id: str):
     """Delete a visitor record via API."""
     try: 
-        response = requests.delete(f"{API_BASE_URL}/visitors/{visitor_id}")
-        return {}, response.status_code == 204
+        response = SESSION.delete(f"{API_BASE_URL}/visitors/{visitor_id}", timeout=REQUEST_TIMEOUT)
+        # Deletion is queued on the API's background worker: wait for it before reloading,
+        # otherwise the refetch can still see (and re-cache) the deleted row
+        if response.status_code != 202:
+            return response.json(), False
+        result, finished = wait_for_task(response.json()["task_id"])
+        success = not finished or (isinstance(result, dict) and result.get("success", False))
+        if success:
+            fetch_all_visitors.clear()
+        return (result if isinstance(result, dict) else {"detail": str(result)}), success
     except Exception as e:
         return {"error": str(e)}, False
 
 # --- STREAMLIT PAGE FUNCTIONS (Build the UI) ---
 
-def display_dashboard(visitors: List[Dict[str, Any]]):
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_occupancy_pie(active_visitors: int, available_spots: int):
+    """Occupied vs available pie; cached on the counts so unchanged reruns skip figure construction."""
+    # Create data for pie chart
+    occupancy_data = pd.DataFrame({
+        'Status': ['Occupied', 'Available'],
+        'Count': [active_visitors, available_spots]
+    })
+    
+    # Color coding
+    colors = ["#FF6B6B", "#51CF66"]
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=occupancy_data['Status'],
+        values=occupancy_data['Count'],
+        hole=0.4,
+        marker_colors=colors,
+        textinfo='label+value+percent',
+        textfont_size=14
+    )])
+    
+    fig.update_layout(
+        showlegend=True,
+        height=400,
+        margin=dict(t=20, b=20, l=20, r=20)
+    )
+    return fig
+
+def display_dashboard(visitors_df: pd.DataFrame):
     """Display parking availability dashboard with charts and stats."""
     
     col_header, col_refresh = st.columns([4, 1])
@@ -146,12 +269,19 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         st.header("📊 Parking Dashboard")
     with col_refresh:
         if st.button("🔄 Refresh", key="refresh_dashboard"):
-            st.rerun()
-    
-    # Calculate statistics - case insensitive status check
-    total_visitors = len(visitors)
-    active_visitors = len([v for v in visitors if v['status'].lower() == 'active'])
-    left_visitors = len([v for v in visitors if v['status'].lower() == 'left'])
+            # Force a fresh fetch (and API check) instead of waiting out the cache TTLs
+            fetch_all_visitors.clear()
+            probe_api.clear()
+            st.rerun(scope="fragment")
+    
+    # Calculate statistics - case insensitive status check, counted in one vectorized pass
+    total_visitors = len(visitors_df)
+    status_counts = (
+        visitors_df['status'].str.lower().value_counts()
+        if 'status' in visitors_df.columns else pd.Series(dtype=int)
+    )
+    active_visitors = int(status_counts.get('active', 0))
+    left_visitors = int(status_counts.get('left', 0))
     available_spots = TOTAL_PARKING_SPOTS - active_visitors
     occupancy_rate = (active_visitors / TOTAL_PARKING_SPOTS * 100) if TOTAL_PARKING_SPOTS > 0 else 0
     
@@ -192,64 +322,31 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
     
     with col_chart1:
         st.subheader("Parking Occupancy")
-        
-        # Create data for pie chart
-        occupancy_data = pd.DataFrame({
-            'Status': ['Occupied', 'Available'],
-            'Count': [active_visitors, available_spots]
-        })
-        
-        # Color coding
-        colors = ["#FF6B6B", "#51CF66"]
-        
-        import plotly.graph_objects as go
-        
-        fig = go.Figure(data=[go.Pie(
-            labels=occupancy_data['Status'],
-            values=occupancy_data['Count'],
-            hole=0.4,
-            marker_colors=colors,
-            textinfo='label+value+percent',
-            textfont_size=14
-        )])
-        
-        fig.update_layout(
-            showlegend=True,
-            height=400,
-            margin=dict(t=20, b=20, l=20, r=20)
+        # Static render: no interactive Plotly machinery for a two-slice chart
+        st.plotly_chart(
+            build_occupancy_pie(active_visitors, available_spots),
+            use_container_width=True,
+            config={"staticPlot": True}
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
     
     with col_chart2:
         st.subheader("Visitor Status Breakdown")
         
-        # Bar chart data
+        # Native bar chart: a much smaller spec over the websocket than a Plotly figure
         status_data = pd.DataFrame({
             'Status': ['Active (Parked)', 'Left', 'Available Spots'],
             'Count': [active_visitors, left_visitors, available_spots],
             'Color': ["#FF6B6B", "#EBA254", "#51CF66"]
         })
-        
-        # Create bar chart
-        fig2 = go.Figure(data=[
-            go.Bar(
-                x=status_data['Status'],
-                y=status_data['Count'],
-                marker_color=status_data['Color'],
-                text=status_data['Count'],
-                textposition='auto',
-            )
-        ])
-        
-        fig2.update_layout(
-            yaxis_title="Number of Spots",
-            showlegend=False,
+        st.bar_chart(
+            status_data,
+            x='Status',
+            y='Count',
+            color='Color',
+            y_label="Number of Spots",
             height=400,
-            margin=dict(t=20, b=20, l=20, r=20)
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig2, use_container_width=True)
     
     st.divider()
 
@@ -262,15 +359,24 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         st.success(f"✅ Parking available - {available_spots} spots free!")
     
     
-def display_visitor_table(visitors: List[Dict[str, Any]]):
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+def dashboard_fragment():
+    """Dashboard tab; refreshes on its own timer without rerunning the rest of the page."""
+    visitors, success = get_all_visitors()
+    if success:
+        display_dashboard(pd.DataFrame(visitors))
+    else:
+        st.error("Failed to retrieve visitors from API.")
+
+def display_visitor_table(visitors_df: pd.DataFrame):
     """Displays all visitors in a styled table format."""
     
-    if not visitors:
+    if visitors_df.empty:
         st.info("No visitors registered yet.")
         return
         
-    # Convert list of dicts to DataFrame for better display
-    df = pd.DataFrame(visitors)
+    # Work on the shared frame built in main(); rename below returns a copy
+    df = visitors_df
     
     # Handle both 'id' and '_id' field names from API
     id_field = 'id' if 'id' in df.columns else '_id'
@@ -293,14 +399,13 @@ def display_visitor_table(visitors: List[Dict[str, Any]]):
     # Format datetime if the column exists
     if 'Registered At' in df.columns:
         try:
-            df['Registered At'] = df['Registered At'].astype(str)
+            # The API emits ISO-8601, so parse with the vectorized ISO path (no per-element inference)
             df['Registered At'] = pd.to_datetime(
                 df['Registered At'],
-                format='mixed',
-                utc=True
-            )
-            df['Registered At'] = df['Registered At'].dt.tz_localize(None)
-            df['Registered At'] = df['Registered At'].dt.strftime('%Y-%m-%d %H:%M')
+                format='ISO8601',
+                utc=True,
+                errors='coerce'
+            ).dt.tz_convert(None).dt.strftime('%Y-%m-%d %H:%M')
         except Exception as e:
             st.warning(f"Error formatting dates: {e}")
             df['Registered At'] = df['Registered At'].astype(str)
@@ -347,16 +452,14 @@ def create_visitor_form():
         )
         
         if uploaded_file is not None:
-            # Display the uploaded image
-            image = Image.open(uploaded_file)
-            
+            # Display the uploaded image (Streamlit serves the file bytes as-is, no PIL decode)
             with col_preview:
-                st.image(image, caption="Uploaded Image", use_container_width=True)
+                st.image(uploaded_file, caption="Uploaded Image", use_container_width=True)
             
-            # Extract license plate button
+            # Extract license plate button (OCR results are cached per file content)
             if st.button("🤖 Scan License Plate", type="secondary"):
                 with st.spinner("🔍 AI is reading the license plate..."):
-                    plate_number = extract_license_plate(image)
+                    plate_number = extract_license_plate(uploaded_file.getvalue())
                     
                     if plate_number:
                         st.success(f"✅ Detected: **{plate_number}**")
@@ -401,117 +504,112 @@ def create_visitor_form():
             else:
                 st.error("All fields are required.")
 
-def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
-    """Combined interface to edit, update status, or delete visitors with card-style UI."""
+EDITABLE_FIELDS = ['name', 'ic_number', 'license_plate', 'unit_number']
+
+def edit_and_manage_visitor_form(visitors_df: pd.DataFrame):
+    """Edit details, change status, or delete visitors in one editable table with a batch save."""
     st.header("⚙️ Edit & Manage Visitors")
     
     # Handle both 'id' and '_id' field names
-    id_field = 'id' if 'id' in visitors[0] else '_id'
+    id_field = 'id' if 'id' in visitors_df.columns else '_id'
+    
+    # A fresh editor key after each save drops the applied edits from the widget state
+    editor_key = f"visitor_editor_{st.session_state.get('editor_version', 0)}"
+    snapshot_key = f"{editor_key}_rows"
+    
+    # The editor reports edits by row position, so it is fed a snapshot indexed by visitor id
+    # that stays fixed while edits are pending; new data (refreshes, other users' writes) is
+    # only picked up when nothing is being edited
+    pending = st.session_state.get(editor_key, {}).get("edited_rows")
+    if snapshot_key not in st.session_state or not pending:
+        snapshot = visitors_df.set_index(id_field).reindex(columns=EDITABLE_FIELDS + ['status'])
+        snapshot['status'] = snapshot['status'].str.lower()
+        snapshot['delete'] = False
+        st.session_state[snapshot_key] = snapshot
+    df = st.session_state[snapshot_key]
+    
+    # One widget for every visitor instead of an expander, tabs and inputs per row
+    st.data_editor(
+        df,
+        key=editor_key,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "name": st.column_config.TextColumn("👤 Name", required=True),
+            "ic_number": st.column_config.TextColumn("🪪 IC Number", required=True),
+            "license_plate": st.column_config.TextColumn("🚘 License Plate", required=True),
+            "unit_number": st.column_config.TextColumn("🏠 Unit Number", required=True),
+            "status": st.column_config.SelectboxColumn(
+                "📊 Status",
+                options=STATUS_OPTIONS,
+                required=True,
+                width="small"
+            ),
+            "delete": st.column_config.CheckboxColumn(
+                "🗑️ Delete",
+                help="Tick to delete this visitor when you save",
+                width="small"
+            )
+        }
+    )
+    
+    # Only the rows the user touched, as {row position: {column: new value}}
+    edited_rows = st.session_state[editor_key]["edited_rows"]
+    to_delete = [row for row, changes in edited_rows.items() if changes.get('delete')]
+    
+    if to_delete:
+        st.warning(f"⚠️ **Warning:** {len(to_delete)} visitor(s) marked for deletion. This action is permanent and cannot be undone!")
+    
+    if not st.button("💾 Save Changes", type="primary", disabled=not edited_rows):
+        return
     
-    # Display visitors in expandable cards
-    for visitor in visitors:
-        visitor_id = visitor[id_field]
+    # Resolve edited positions to visitor ids through the snapshot, and refuse to save
+    # if any of them has since been deleted
+    edits = {df.index[row]: changes for row, changes in edited_rows.items()}
+    current = visitors_df.set_index(id_field)
+    missing = [visitor_id for visitor_id in edits if visitor_id not in current.index]
+    if missing:
+        st.session_state.pop(snapshot_key, None)
+        st.session_state.editor_version = st.session_state.get('editor_version', 0) + 1
+        st.error(f"❌ {len(missing)} edited visitor(s) no longer exist. Nothing was saved; the table has been reloaded, please re-apply your changes.")
+        return
+    
+    errors = []
+    for visitor_id, changes in edits.items():
+        # Unchanged fields and the status comparison come from the shared frame's current row
+        visitor = current.loc[visitor_id]
         
-        # Create an expander for each visitor (card-style)
-        with st.expander(
-            f"🚗 {visitor['name']} | {visitor['license_plate']} | Status: {visitor['status'].capitalize()}",
-            expanded=False
-        ):
-            # Show visitor details
-            col_info1, col_info2 = st.columns(2)
-            
-            with col_info1:
-                st.markdown(f"**👤 Name:** {visitor['name']}")
-                st.markdown(f"**🪪 IC Number:** {visitor['ic_number']}")
-            
-            with col_info2:
-                st.markdown(f"**🚘 License Plate:** {visitor['license_plate']}")
-                st.markdown(f"**🏠 Unit Number:** {visitor['unit_number']}")
-            
-            st.markdown(f"**📊 Status:** :blue[{visitor['status'].capitalize()}]")
-            st.markdown(f"**🕐 Registered:** {visitor.get('registered_at', 'N/A')}")
-            
-            st.divider()
-            
-            # Create tabs within each card for Edit/Status/Delete
-            tab_edit, tab_status, tab_delete = st.tabs(["✏️ Edit Details", "🔄 Change Status", "🗑️ Delete"])
-            
-            with tab_edit:
-                with st.form(f"edit_form_{visitor_id}"):
-                    st.markdown("##### Edit Visitor Information")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        new_name = st.text_input("Name", value=visitor['name'], key=f"name_{visitor_id}")
-                        new_plate = st.text_input("License Plate", value=visitor['license_plate'], key=f"plate_{visitor_id}")
-                    
-                    with col2:
-                        new_ic = st.text_input("IC Number", value=visitor['ic_number'], key=f"ic_{visitor_id}")
-                        new_unit = st.text_input("Unit Number", value=visitor['unit_number'], key=f"unit_{visitor_id}")
-                    
-                    submit_edit = st.form_submit_button("💾 Save Changes", type="primary")
-                    
-                    if submit_edit:
-                        if all([new_name, new_ic, new_plate, new_unit]):
-                            result, success = edit_visitor(visitor_id, new_name, new_ic, new_plate, new_unit)
-                            if success:
-                                st.success("✅ Details updated successfully!")
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Update failed: {result.get('detail', 'Unknown error')}")
-                        else:
-                            st.error("All fields are required.")
-            
-            with tab_status:
-                st.markdown("##### Change Visitor Status")
-                current_status = visitor['status'].lower()
-                
-                col_status1, col_status2 = st.columns([2, 1])
-                
-                with col_status1:
-                    new_status = st.radio(
-                        "Select new status:",
-                        options=STATUS_OPTIONS,
-                        format_func=str.capitalize,
-                        index=STATUS_OPTIONS.index(current_status),
-                        key=f"status_{visitor_id}",
-                        horizontal=True
-                    )
-                
-                with col_status2:
-                    if st.button("🔄 Update Status", key=f"update_status_{visitor_id}", type="primary"):
-                        result, success = update_visitor_status(visitor_id, new_status)
-                        if success:
-                            st.success(f"✅ Status updated to '{new_status.capitalize()}'")
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Failed: {result.get('detail', 'Unknown error')}")
-            
-            with tab_delete:
-                st.markdown("##### Delete Visitor Record")
-                st.warning("⚠️ **Warning:** This action is permanent and cannot be undone!")
-                
-                col_del1, col_del2, col_del3 = st.columns([1, 1, 2])
-                
-                with col_del1:
-                    if st.button("🗑️ Delete", key=f"delete_{visitor_id}", type="secondary"):
-                        if st.session_state.get('confirm_delete') != visitor_id:
-                            st.session_state['confirm_delete'] = visitor_id
-                
-                with col_del2:
-                    if st.session_state.get('confirm_delete') == visitor_id:
-                        if st.button("✅ Confirm Delete", key=f"confirm_delete_{visitor_id}", type="primary"):
-                            result, success = delete_visitor(visitor_id)
-                            if success:
-                                st.session_state['confirm_delete'] = None
-                                st.success("✅ Visitor deleted successfully!")
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Failed: {result.get('detail', 'Unknown error')}")
-                
-                with col_del3:
-                    if st.session_state.get('confirm_delete') == visitor_id:
-                        st.error("👈 Click 'Confirm Delete' to proceed")
+        if changes.get('delete'):
+            result, success = delete_visitor(visitor_id)
+            if not success:
+                errors.append(f"{visitor['name']}: {result.get('detail', 'Unknown error')}")
+            continue
+        
+        if any(field in changes for field in EDITABLE_FIELDS):
+            details = {field: changes.get(field, visitor[field]) for field in EDITABLE_FIELDS}
+            if not all(details.values()):
+                errors.append(f"{visitor['name']}: All fields are required.")
+                continue
+            result, success = edit_visitor(visitor_id, **details)
+            if not success:
+                errors.append(f"{visitor['name']}: {result.get('detail', 'Unknown error')}")
+                continue
+        
+        if changes.get('status') and changes['status'] != visitor['status'].lower():
+            result, success = update_visitor_status(visitor_id, changes['status'])
+            if not success:
+                errors.append(f"{visitor['name']}: {result.get('detail', 'Unknown error')}")
+    
+    # Start the next run from the refreshed data (failed rows need re-entering)
+    st.session_state.pop(snapshot_key, None)
+    st.session_state.editor_version = st.session_state.get('editor_version', 0) + 1
+    if errors:
+        for error in errors:
+            st.error(f"❌ {error}")
+        return
+    
+    st.toast("✅ Changes saved!", icon="🎉")
+    st.rerun()
 
 
 def main():
@@ -539,6 +637,9 @@ def main():
         st.error("Failed to retrieve visitors from API.")
         return
 
+    # Built once and shared by the visitor table and the manage editor
+    visitors_df = pd.DataFrame(visitors)
+
     # Update tabs
     tab_register, tab_dashboard, tab_view, tab_manage = st.tabs([
         "🚗 Register Visitor", 
@@ -548,18 +649,18 @@ def main():
     ])
     
     with tab_dashboard:
-        display_dashboard(visitors)
+        dashboard_fragment()
 
     with tab_register:
         create_visitor_form()
 
     with tab_view:
-        st.header(f"📋 All Registered Visitors ({len(visitors)})")
-        display_visitor_table(visitors)
+        st.header(f"📋 All Registered Visitors ({len(visitors_df)})")
+        display_visitor_table(visitors_df)
             
     with tab_manage:
-        if visitors:
-            edit_and_manage_visitor_form(visitors)
+        if not visitors_df.empty:
+            edit_and_manage_visitor_form(visitors_df)
         else:
             st.info("No visitors to manage yet. Please register one first.")
 
@@ -1,50 +1,94 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
+import plotly.graph_objects as go
 from typing import List, Dict, Any
 from datetime import datetime
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import time
-import os
-from dotenv import load_dotenv
 from chatbot import get_chatbot
 
-
-#  Updated Chatbot imports for LangChain v0.1+
-from langchain_core.tools import tool
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from pymongo import MongoClient
-
-load_dotenv()
-
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = time.time()
-if 'refresh_interval' not in st.session_state:
-    st.session_state.refresh_interval = 5  # Refresh every 5 second
+logger = logging.getLogger(__name__)
 
 API_BASE_URL = "http://localhost:8000" 
 STATUS_OPTIONS = ["active", "left"]  
 TOTAL_PARKING_SPOTS = 105
-
-# Initialize Gemini LLM for chatbot
-try:
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.2
-    )
-except:
-    llm = None  # Chatbot will be disabled if API key not found
+VISITORS_PAGE_SIZE = 500  # max page size accepted by GET /visitors/
+VISITORS_CACHE_TTL = 5  # seconds, matching DASHBOARD_REFRESH_SECONDS; writes below clear the cache straight away
+DASHBOARD_REFRESH_SECONDS = 5  # the dashboard re-polls its stats on this timer
+QUICK_ANSWER_MAX_AGE = 3  # seconds a prefetched quick answer stays usable; they carry live counts
+API_PROBE_TTL = 10  # seconds a successful API liveness check is reused
+REQUEST_TIMEOUT = (2, 5)  # (connect, read) seconds, so a hung socket can't stall the script
+DELETE_WAIT_SECONDS = 5  # how long a delete waits for its background task before reloading anyway
+TASK_POLL_INTERVAL = 0.25  # seconds between /tasks/{task_id} polls
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One pooled keep-alive session per Streamlit server, reused by every API helper across reruns."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+SESSION = get_http_session()
+
+@st.cache_data(ttl=API_PROBE_TTL, show_spinner=False)
+def probe_api() -> bool:
+    """HEAD the API root (no body); raises if unreachable so a failed probe is never cached."""
+    response = SESSION.head(f"{API_BASE_URL}/", timeout=1)
+    response.raise_for_status()
+    return True
 
 def check_api_connection():
-    """Check if the FastAPI server is running and accessible."""
-    try:
-        response = requests.get(f"{API_BASE_URL}/") 
-        return response.status_code == 200
-    except:
-        return False
-    
+    """Check if the FastAPI server is running and accessible (one immediate retry on failure)."""
+    for _ in range(2):
+        try:
+            return probe_api()
+        except requests.RequestException:
+            continue
+    return False
+
+def warn_api_failure(error: requests.RequestException):
+    """Surface a failed API read, at most once a second so one outage isn't reported per helper."""
+    now = time.time()
+    if now - st.session_state.get('last_api_warning', 0) >= 1:
+        st.session_state.last_api_warning = now
+        st.warning(f"⚠️ API request failed ({error.__class__.__name__}); showing what could be loaded.")
+    
+# Joins the searchable fields; it can't be typed into a text_input, so a match never spans two fields
+SEARCH_FIELD_SEP = '\n'
+
+def add_search_keys(visitors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Copy each visitor with a lowercased name and its searchable fields pre-joined,
+    computed once per rerun in main() so filters never re-lowercase or re-scan per field.
+    """
+    prepared = []
+    for v in visitors:
+        name, ic_number, license_plate, unit_number = (
+            (v.get(field) or '').lower()
+            for field in ('name', 'ic_number', 'license_plate', 'unit_number')
+        )
+        prepared.append({
+            **v,
+            '_name_l': name,
+            # View-table search (name, IC, plate) and manage search (plus unit)
+            '_search': SEARCH_FIELD_SEP.join((name, ic_number, license_plate)),
+            '_search_unit': SEARCH_FIELD_SEP.join((name, ic_number, license_plate, unit_number))
+        })
+    return prepared
+
+def text_column(df: pd.DataFrame, field: str) -> pd.Series:
+    """A visitor field as strings, with missing values (or a missing column) as ''."""
+    if field not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[field].fillna('').astype(str)
+
 def search_and_filter_visitors(visitors: List[Dict[str, Any]], 
+                                 visitors_df: pd.DataFrame,
                                  search_query: str = "", 
                                  status_filter: str = "All",
                                  unit_filter: str = "All",
@@ -52,77 +96,55 @@ def search_and_filter_visitors(visitors: List[Dict[str, Any]],
                                  date_to = None) -> List[Dict[str, Any]]:
     """
     Filter visitors based on search query and filters.
+    Expects visitors prepared by add_search_keys and their column view from main().
     """
     if not visitors:
         return []
     
-    filtered = visitors.copy()
+    # One boolean mask over the column view: each filter is a single vectorized pass
+    df = visitors_df
+    mask = pd.Series(True, index=df.index)
     
     # Search by name, IC, or license plate
     if search_query:
         search_query = search_query.lower()
-        filtered = [
-            v for v in filtered
-            if search_query in v.get('name', '').lower() or
-               search_query in v.get('ic_number', '').lower() or
-               search_query in v.get('license_plate', '').lower()
-        ]
+        mask &= text_column(df, '_search').str.contains(search_query, regex=False)
     
     # Filter by status
     if status_filter != "All":
-        filtered = [v for v in filtered if v.get('status', '').lower() == status_filter.lower()]
+        mask &= text_column(df, 'status').eq(status_filter.lower())
     
     # Filter by unit
     if unit_filter != "All":
-        filtered = [v for v in filtered if v.get('unit_number', '') == unit_filter]
+        mask &= text_column(df, 'unit_number').eq(unit_filter)
     
-    # Filter by date range
+    # Filter by date range (parsed once for the whole column, floored to the day);
+    # unparseable dates become NaT and fail every comparison
     if date_from or date_to:
-        date_filtered = []
-        for v in filtered:
-            try:
-                # Handle both string and datetime objects
-                reg_datetime = v.get('created_at')
-                if isinstance(reg_datetime, str):
-                    reg_date = pd.to_datetime(reg_datetime).date()
-                else:
-                    reg_date = pd.to_datetime(reg_datetime).date()
-                
-                # Check date range
-                include = True
-                if date_from and date_to:
-                    # Both dates selected
-                    if not (date_from <= reg_date <= date_to):
-                        include = False
-                elif date_from:
-                    # Only from date
-                    if reg_date < date_from:
-                        include = False
-                elif date_to:
-                    # Only to date
-                    if reg_date > date_to:
-                        include = False
-                
-                if include:
-                    date_filtered.append(v)
-            except Exception as e:
-                # If date parsing fails, skip this visitor
-                continue
-        filtered = date_filtered
+        reg_dates = pd.to_datetime(
+            df['created_at'] if 'created_at' in df.columns else pd.Series(None, index=df.index, dtype=object),
+            format='mixed',
+            utc=True,
+            errors='coerce'
+        ).dt.tz_localize(None).dt.floor('D')
+        
+        mask &= reg_dates.notna()
+        if date_from:
+            mask &= reg_dates >= pd.Timestamp(date_from)
+        if date_to:
+            mask &= reg_dates <= pd.Timestamp(date_to)
     
-    return filtered
+    # Materialize once, returning the original visitor dicts
+    return [v for v, keep in zip(visitors, mask) if keep]
 
 
-def display_search_filters(visitors: List[Dict[str, Any]]):
+def display_search_filters(visitors: List[Dict[str, Any]], visitors_df: pd.DataFrame, unique_units: List[str]):
     """
     Display search and filter controls.
     Returns filtered visitor list.
     """
     st.subheader("🔍 Search & Filter")
     
-    # Get unique units for filter
-    unique_units = sorted(list(set([v.get('unit_number', '') for v in visitors if v.get('unit_number')])))
-    
     # Search bar
     col_search, col_status, col_unit = st.columns([2, 1, 1])
     
@@ -169,6 +191,7 @@ def display_search_filters(visitors: List[Dict[str, Any]]):
     # Apply filters
     filtered_visitors = search_and_filter_visitors(
         visitors,
+        visitors_df,
         search_query,
         status_filter,
         unit_filter,
@@ -182,16 +205,51 @@ def display_search_filters(visitors: List[Dict[str, Any]]):
     
     return filtered_visitors
 
+@st.cache_data(ttl=VISITORS_CACHE_TTL, show_spinner=False)
+def fetch_all_visitors() -> List[Dict[str, Any]]:
+    """Fetch every visitor, following the pagination cursor; raises on failure so errors are never cached."""
+    visitors = []
+    params = {"limit": VISITORS_PAGE_SIZE}
+    while True:
+        response = SESSION.get(f"{API_BASE_URL}/visitors/", params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        page = response.json()
+        # Canonicalize status once here (the CLI stores "Active"/"Left"), so no caller re-lowercases it
+        for visitor in page["items"]:
+            visitor['status'] = (visitor.get('status') or '').lower()
+        visitors.extend(page["items"])
+        if not page.get("next_cursor"):
+            return visitors
+        params["after_id"] = page["next_cursor"]
+
 def get_all_visitors() -> List[Dict[str, Any]]:
-    """Get all visitors via API."""
+    """Get all visitors via API (served from the rerun cache when fresh)."""
     try: 
-        response = requests.get(f"{API_BASE_URL}/visitors/")
-        if response.status_code == 200:
-            return response.json(), True
-        return [], False
-    except:
+        return fetch_all_visitors(), True
+    except requests.RequestException as e:
+        warn_api_failure(e)
         return [], False
 
+@st.cache_data(ttl=DASHBOARD_REFRESH_SECONDS, show_spinner=False)
+def fetch_visitor_stats() -> Dict[str, int]:
+    """Fetch visitor counts by status; raises on failure so errors are never cached."""
+    response = SESSION.get(f"{API_BASE_URL}/visitors/stats", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def get_visitor_stats():
+    """Get active/left/total visitor counts for the dashboard in one small request."""
+    try:
+        return fetch_visitor_stats(), True
+    except requests.RequestException as e:
+        warn_api_failure(e)
+        return {}, False
+
+def clear_visitor_caches():
+    """Drop cached visitor data after a write so the next rerun sees it."""
+    fetch_all_visitors.clear()
+    fetch_visitor_stats.clear()
+
 def create_visitor(name: str, ic_number: str, license_plate: str, unit_number: str):
     """
     Register a new visitor via API. 
@@ -204,23 +262,31 @@ def create_visitor(name: str, ic_number: str, license_plate: str, unit_number: s
         "unit_number": unit_number
     }
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{API_BASE_URL}/visitors/",
-            json=payload
+            json=payload,
+            timeout=REQUEST_TIMEOUT
         )
-        return response.json(), response.status_code == 201
-    except Exception as e:
+        success = response.status_code == 201
+        if success:
+            clear_visitor_caches()
+        return response.json(), success
+    except requests.RequestException as e:
         return {"error": str(e)}, False
 
 def update_visitor_status(visitor_id: str, new_status: str):
     """Update an existing visitor's status via API."""
     try:
-        response = requests.put(
+        response = SESSION.put(
             f"{API_BASE_URL}/visitors/{visitor_id}/status",
-            json={"status": new_status}
+            json={"status": new_status},
+            timeout=REQUEST_TIMEOUT
         )
-        return response.json(), response.status_code == 200
-    except Exception as e:
+        success = response.status_code == 200
+        if success:
+            clear_visitor_caches()
+        return response.json(), success
+    except requests.RequestException as e:
         return {"error": str(e)}, False
 
 def edit_visitor(visitor_id: str, name: str, ic_number: str, license_plate: str, unit_number: str):
@@ -232,28 +298,107 @@ def edit_visitor(visitor_id: str, name: str, ic_number: str, license_plate: str,
         "unit_number": unit_number
     }
     try:
-        response = requests.put(
+        response = SESSION.put(
             f"{API_BASE_URL}/visitors/{visitor_id}",
-            json=payload
+            json=payload,
+            timeout=REQUEST_TIMEOUT
         )
         if response.status_code == 200:
+            clear_visitor_caches()
             return response.json(), True
         else:
             return response.json(), False
-    except Exception as e:
+    except requests.RequestException as e:
         return {"error": str(e)}, False
 
+def wait_for_task(task_id: str) -> tuple[Dict[str, Any], bool]:
+    """Poll a queued API task until it finishes (or DELETE_WAIT_SECONDS pass); returns (result, finished)."""
+    deadline = time.monotonic() + DELETE_WAIT_SECONDS
+    while True:
+        response = SESSION.get(f"{API_BASE_URL}/tasks/{task_id}", timeout=REQUEST_TIMEOUT)
+        task_status = response.json()
+        if "result" in task_status:
+            return task_status["result"], True
+        if time.monotonic() >= deadline:
+            return task_status, False
+        time.sleep(TASK_POLL_INTERVAL)
+
 def delete_visitor(visitor_id: str):
     """Delete a visitor record via API."""
     try: 
-        response = requests.delete(f"{API_BASE_URL}/visitors/{visitor_id}")
-        return {}, response.status_code == 204
-    except Exception as e:
+        response = SESSION.delete(f"{API_BASE_URL}/visitors/{visitor_id}", timeout=REQUEST_TIMEOUT)
+        # Deletion is queued on the API's background worker: wait for it before reloading,
+        # otherwise the refetch can still see (and re-cache) the deleted row
+        if response.status_code != 202:
+            return response.json(), False
+        result, finished = wait_for_task(response.json()["task_id"])
+        success = not finished or (isinstance(result, dict) and result.get("success", False))
+        if success:
+            clear_visitor_caches()
+        return (result if isinstance(result, dict) else {"detail": str(result)}), success
+    except requests.RequestException as e:
         return {"error": str(e)}, False
 
 # --- STREAMLIT PAGE FUNCTIONS (UI) ---
 
-def display_dashboard(visitors: List[Dict[str, Any]]):
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_occupancy_pie(active_visitors: int, available_spots: int):
+    """Occupied vs available pie; cached on the counts so unchanged reruns skip figure construction."""
+    # Create data for pie chart
+    occupancy_data = pd.DataFrame({
+        'Status': ['Occupied', 'Available'],
+        'Count': [active_visitors, available_spots]
+    })
+    
+    # Color coding
+    colors = ["#FF6B6B", "#51CF66"]
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=occupancy_data['Status'],
+        values=occupancy_data['Count'],
+        hole=0.4,
+        marker_colors=colors,
+        textinfo='label+value+percent',
+        textfont_size=14
+    )])
+    
+    fig.update_layout(
+        showlegend=True,
+        height=400,
+        margin=dict(t=20, b=20, l=20, r=20)
+    )
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_status_bar(active_visitors: int, left_visitors: int, available_spots: int):
+    """Status breakdown bar chart; cached on the counts like build_occupancy_pie."""
+    # Bar chart data
+    status_data = pd.DataFrame({
+        'Status': ['Active (Parked)', 'Left', 'Available Spots'],
+        'Count': [active_visitors, left_visitors, available_spots],
+        'Color': ["#FF6B6B", "#EBA254", "#51CF66"]
+    })
+    
+    # Create bar chart
+    fig = go.Figure(data=[
+        go.Bar(
+            x=status_data['Status'],
+            y=status_data['Count'],
+            marker_color=status_data['Color'],
+            text=status_data['Count'],
+            textposition='auto',
+        )
+    ])
+    
+    fig.update_layout(
+        yaxis_title="Number of Spots",
+        showlegend=False,
+        height=400,
+        margin=dict(t=20, b=20, l=20, r=20)
+    )
+    return fig
+
+def display_dashboard(stats: Dict[str, int]):
     """Display parking availability dashboard with charts and stats."""
     
     col_header, col_refresh = st.columns([4, 1])
@@ -261,12 +406,14 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
         st.header("📊 Parking Dashboard")
     with col_refresh:
         if st.button("🔄 Refresh", key="refresh_dashboard"):
-            st.rerun()
-    
-    # Calculate statistics - case insensitive status check
-    total_visitors = len(visitors)
-    active_visitors = len([v for v in visitors if v['status'].lower() == 'active'])
-    left_visitors = len([v for v in visitors if v['status'].lower() == 'left'])
+            # Force a fresh fetch instead of waiting out the cache TTL
+            clear_visitor_caches()
+            st.rerun(scope="fragment")
+    
+    # Statistics are counted by the API (status case folded server-side)
+    total_visitors = stats.get('total', 0)
+    active_visitors = stats.get('active', 0)
+    left_visitors = stats.get('left', 0)
     available_spots = TOTAL_PARKING_SPOTS - active_visitors
     occupancy_rate = (active_visitors / TOTAL_PARKING_SPOTS * 100) if TOTAL_PARKING_SPOTS > 0 else 0
     
@@ -307,64 +454,14 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
     
     with col_chart1:
         st.subheader("Parking Occupancy")
-        
-        # Create data for pie chart
-        occupancy_data = pd.DataFrame({
-            'Status': ['Occupied', 'Available'],
-            'Count': [active_visitors, available_spots]
-        })
-        
-        # Color coding
-        colors = ["#FF6B6B", "#51CF66"]
-        
-        import plotly.graph_objects as go
-        
-        fig = go.Figure(data=[go.Pie(
-            labels=occupancy_data['Status'],
-            values=occupancy_data['Count'],
-            hole=0.4,
-            marker_colors=colors,
-            textinfo='label+value+percent',
-            textfont_size=14
-        )])
-        
-        fig.update_layout(
-            showlegend=True,
-            height=400,
-            margin=dict(t=20, b=20, l=20, r=20)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(build_occupancy_pie(active_visitors, available_spots), use_container_width=True)
     
     with col_chart2:
         st.subheader("Visitor Status Breakdown")
-        
-        # Bar chart data
-        status_data = pd.DataFrame({
-            'Status': ['Active (Parked)', 'Left', 'Available Spots'],
-            'Count': [active_visitors, left_visitors, available_spots],
-            'Color': ["#FF6B6B", "#EBA254", "#51CF66"]
-        })
-        
-        # Create bar chart
-        fig2 = go.Figure(data=[
-            go.Bar(
-                x=status_data['Status'],
-                y=status_data['Count'],
-                marker_color=status_data['Color'],
-                text=status_data['Count'],
-                textposition='auto',
-            )
-        ])
-        
-        fig2.update_layout(
-            yaxis_title="Number of Spots",
-            showlegend=False,
-            height=400,
-            margin=dict(t=20, b=20, l=20, r=20)
+        st.plotly_chart(
+            build_status_bar(active_visitors, left_visitors, available_spots),
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig2, use_container_width=True)
     
     st.divider()
 
@@ -376,7 +473,59 @@ def display_dashboard(visitors: List[Dict[str, Any]]):
     else:
         st.success(f"✅ Parking available - {available_spots} spots free!")
 
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+def dashboard_fragment():
+    """Dashboard tab; refreshes on its own timer without rerunning the rest of the page."""
+    stats, success = get_visitor_stats()
+    if success:
+        display_dashboard(stats)
+    else:
+        st.error("Failed to retrieve visitor statistics from API.")
+
+# Preset chatbot questions: (button label, question sent to the bot, prefetch?)
+# Only the database-backed answers are prefetched; the canned how-to/help replies are instant anyway
+QUICK_QUESTIONS = [
+    ("📊 How many spots are available?", "How many visitors are currently parked and how many spots are available?", True),
+    ("📋 Can you list all visitors?", "Show me all visitors", True),
+    ("🔍 How can I search for visitors?", "How can I search for specific visitors by name or license plate?", False),
+    ("🏢 How to find visitors by unit?", "How can I find all visitors for a specific unit number?", False),
+    ("🟢 Who are the active visitors?", "Show me all active visitors currently parked", True),
+    ("🆘 What can you help with?", "What can you help me with?", False)
+]
+
+@st.cache_resource
+def get_chat_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all sessions for answering quick questions in the background."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="quick-answers")
+
+def prefetch_quick_answers(bot):
+    """
+    Start answering the database-backed quick questions concurrently, so a click finds its answer ready.
+    Only called once the session has chatted, so idle page views don't query the database.
+    """
+    now = time.time()
+    pending = st.session_state.setdefault('quick_futures', {})
+    executor = get_chat_executor()
+    for _, question, prefetch in QUICK_QUESTIONS:
+        if not prefetch:
+            continue
+        started = pending.get(question)
+        if started is None or now - started[0] > QUICK_ANSWER_MAX_AGE:
+            pending[question] = (now, executor.submit(bot.get_response, question))
+
+def get_quick_answer(bot, question: str) -> str:
+    """Use the prefetched answer if it is still fresh, otherwise ask the bot directly."""
+    started = st.session_state.get('quick_futures', {}).pop(question, None)
+    if started and time.time() - started[0] <= QUICK_ANSWER_MAX_AGE:
+        try:
+            return started[1].result(timeout=30)
+        except Exception:
+            logger.warning("Prefetched quick answer failed, asking again: %s", question, exc_info=True)
+    return bot.get_response(question)
+
 # 🆕 NEW: Chatbot display function
+# A fragment: chatting, quick questions and clearing rerun only this panel, not the visitor tabs
+@st.fragment
 def display_chatbot():
     """Display the AI chatbot interface."""
     st.header("🤖 AI Parking Assistant")
@@ -427,20 +576,14 @@ def display_chatbot():
     st.divider()
     st.markdown("**💡 Quick Questions:**")
     
-    # Define preset questions
-    quick_questions = [
-        ("📊 How many spots are available?", "How many visitors are currently parked and how many spots are available?"),
-        ("📋 Can you list all visitors?", "Show me all visitors"),
-        ("🔍 How can I search for visitors?", "How can I search for specific visitors by name or license plate?"),
-        ("🏢 How to find visitors by unit?", "How can I find all visitors for a specific unit number?"),
-        ("🟢 Who are the active visitors?", "Show me all active visitors currently parked"),
-        ("🆘 What can you help with?", "What can you help me with?")
-    ]
+    # Answer all preset questions in parallel ahead of the click, once the user is actually chatting
+    if st.session_state.chat_messages:
+        prefetch_quick_answers(bot)
     
     # Display buttons in 3 columns, 2 rows
     col1, col2, col3 = st.columns(3)
     
-    for i, (label, question) in enumerate(quick_questions):
+    for i, (label, question, _) in enumerate(QUICK_QUESTIONS):
         col = [col1, col2, col3][i % 3]
         
         with col:
@@ -450,36 +593,26 @@ def display_chatbot():
                 
                 # Get response
                 with st.spinner("Getting answer..."):
-                    response = bot.get_response(question)
+                    response = get_quick_answer(bot, question)
                     st.session_state.chat_messages.append({"role": "assistant", "content": response})
                 
-                st.rerun()
+                st.rerun(scope="fragment")
     
     st.divider()
     
     # Clear chat button
     if st.button("🗑️ Clear Chat History", use_container_width=True):
         st.session_state.chat_messages = []
-        st.rerun()
-def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = True):
-    """Displays all visitors in a styled table format."""
-    
-    if not visitors:
-        st.info("No visitors registered yet.")
-        return
-    
-    # Add search and filters
-    if show_filters:
-        filtered_visitors = display_search_filters(visitors)
-    else:
-        filtered_visitors = visitors
-    
-    if not filtered_visitors:
-        st.warning("No visitors match your search criteria.")
-        return
-        
+        st.rerun(scope="fragment")
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_visitor_table(visitors: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the display DataFrame for the visitor table.
+    Cached on the visitor rows themselves, so reruns that only touch other widgets
+    skip the DataFrame build and date parsing, and changed data is never served stale.
+    """
     # Convert list of dicts to DataFrame for better display
-    df = pd.DataFrame(filtered_visitors)
+    df = pd.DataFrame(visitors)
     
     # Handle both 'id' and '_id' field names from API
     id_field = 'id' if 'id' in df.columns else '_id'
@@ -502,21 +635,18 @@ def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = T
     # Format datetime if the column exists
     if 'Registered At' in df.columns:
         try:
-            df['Registered At'] = df['Registered At'].astype(str)
             df['Registered At'] = pd.to_datetime(
                 df['Registered At'],
                 format='mixed',
                 utc=True
-            )
-            df['Registered At'] = df['Registered At'].dt.tz_localize(None)
-            df['Registered At'] = df['Registered At'].dt.strftime('%Y-%m-%d %H:%M')
+            ).dt.tz_localize(None).dt.strftime('%Y-%m-%d %H:%M')
         except Exception as e:
             st.warning(f"Error formatting dates: {e}")
             df['Registered At'] = df['Registered At'].astype(str)
     
-    # Truncate ID for display
+    # Truncate ID for display (plain comprehension beats the object-dtype .str accessor)
     if 'ID' in df.columns:
-        df['ID'] = df['ID'].str[:8] + '...'
+        df['ID'] = [f"{visitor_id[:8]}..." for visitor_id in df['ID'].to_numpy()]
 
     # Select and order columns
     display_columns = [col for col in [
@@ -525,9 +655,30 @@ def display_visitor_table(visitors: List[Dict[str, Any]], show_filters: bool = T
         'Registered At'
     ] if col in df.columns]
     
+    return df[display_columns]
+
+def display_visitor_table(visitors: List[Dict[str, Any]], visitors_df: pd.DataFrame, unique_units: List[str], show_filters: bool = True):
+    """Displays all visitors in a styled table format."""
+    
+    if not visitors:
+        st.info("No visitors registered yet.")
+        return
+    
+    # Add search and filters
+    if show_filters:
+        filtered_visitors = display_search_filters(visitors, visitors_df, unique_units)
+    else:
+        filtered_visitors = visitors
+    
+    if not filtered_visitors:
+        st.warning("No visitors match your search criteria.")
+        return
+        
+    df = build_visitor_table(filtered_visitors)
+    
     # Display the dataframe
     st.dataframe(
-        df[display_columns],
+        df,
         hide_index=True,
         use_container_width=True,
         column_config={
@@ -573,7 +724,7 @@ def create_visitor_form():
             else:
                 st.error("All fields are required.")
 
-def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
+def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]], visitors_df: pd.DataFrame):
     """Combined interface to edit, update status, or delete visitors with card-style UI and search."""
     st.header("⚙️ Edit & Manage Visitors")
     
@@ -612,34 +763,22 @@ def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
             key="manage_sort"
         )
     
-    # Filter visitors based on search
-    filtered_visitors = visitors.copy()
-    
-    # Apply search filter
+    # Filter visitors based on search and status with one mask over the column view
+    mask = pd.Series(True, index=visitors_df.index)
+    if search_status != "All":
+        mask &= text_column(visitors_df, 'status').eq(search_status.lower())
     if search_query:
         search_lower = search_query.lower()
-        filtered_visitors = [
-            v for v in filtered_visitors
-            if search_lower in v.get('name', '').lower() or
-               search_lower in v.get('ic_number', '').lower() or
-               search_lower in v.get('license_plate', '').lower() or
-               search_lower in v.get('unit_number', '').lower()
-        ]
-    
-    # Apply status filter
-    if search_status != "All":
-        filtered_visitors = [
-            v for v in filtered_visitors
-            if v.get('status', '').lower() == search_status.lower()
-        ]
+        mask &= text_column(visitors_df, '_search_unit').str.contains(search_lower, regex=False)
+    filtered_visitors = [v for v, keep in zip(visitors, mask) if keep]
     
     # Apply sorting
     if sort_by == "Recent First":
         pass  # Already sorted by default
     elif sort_by == "Name (A-Z)":
-        filtered_visitors = sorted(filtered_visitors, key=lambda x: x.get('name', '').lower())
+        filtered_visitors = sorted(filtered_visitors, key=itemgetter('_name_l'))
     elif sort_by == "Name (Z-A)":
-        filtered_visitors = sorted(filtered_visitors, key=lambda x: x.get('name', '').lower(), reverse=True)
+        filtered_visitors = sorted(filtered_visitors, key=itemgetter('_name_l'), reverse=True)
     elif sort_by == "Unit Number":
         filtered_visitors = sorted(filtered_visitors, key=lambda x: x.get('unit_number', ''))
     
@@ -661,7 +800,7 @@ def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
         visitor_id = visitor[id_field]
         
         card_title = f"🚗 {visitor['name']} | {visitor['license_plate']} | Unit: {visitor['unit_number']} | Status: {visitor['status'].capitalize()}"
-        status_emoji = "🟢" if visitor['status'].lower() == 'active' else "🔴"
+        status_emoji = "🟢" if visitor['status'] == 'active' else "🔴"
         
         with st.expander(f"{status_emoji} {card_title}", expanded=False):
             # Show visitor details
@@ -675,7 +814,7 @@ def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
                 st.markdown(f"**🚘 License Plate:** {visitor['license_plate']}")
                 st.markdown(f"**🏠 Unit Number:** {visitor['unit_number']}")
             
-            st.markdown(f"**📊 Status:** :{'green' if visitor['status'].lower() == 'active' else 'red'}[{visitor['status'].capitalize()}]")
+            st.markdown(f"**📊 Status:** :{'green' if visitor['status'] == 'active' else 'red'}[{visitor['status'].capitalize()}]")
             
             # Better date formatting
             created_at = visitor.get('created_at', 'N/A')
@@ -726,7 +865,7 @@ def edit_and_manage_visitor_form(visitors: List[Dict[str, Any]]):
             
             with tab_status:
                 st.markdown("##### Change Visitor Status")
-                current_status = visitor['status'].lower()
+                current_status = visitor['status']
                 
                 col_status1, col_status2 = st.columns([2, 1])
                 
@@ -808,6 +947,12 @@ def main():
         st.error("Failed to retrieve visitors from API.")
         return
 
+    # Normalize once per rerun for every filter below
+    visitors = add_search_keys(visitors)
+    unique_units = sorted({v['unit_number'] for v in visitors if v.get('unit_number')})
+    # Column-per-field view for the filters; the row dicts are kept for rendering
+    visitors_df = pd.DataFrame(visitors)
+
     # 🔄 UPDATED: Reordered tabs to match your desired order
     tab_register, tab_view, tab_manage, tab_dashboard, tab_chatbot = st.tabs([
         "🚗 Register Visitor", 
@@ -823,16 +968,16 @@ def main():
 
     with tab_view:
         st.header(f"📋 All Registered Visitors ({len(visitors)})")
-        display_visitor_table(visitors)
+        display_visitor_table(visitors, visitors_df, unique_units)
             
     with tab_manage:
         if visitors:
-            edit_and_manage_visitor_form(visitors)
+            edit_and_manage_visitor_form(visitors, visitors_df)
         else:
             st.info("No visitors to manage yet. Please register one first.")
     
     with tab_dashboard:
-        display_dashboard(visitors)
+        dashboard_fragment()
     
     # 🆕 NEW: Chatbot tab moved to the end
     with tab_chatbot: